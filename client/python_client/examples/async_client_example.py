@@ -14,19 +14,14 @@ parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-# Try different import approaches
+# parent_dir holds the locallab_client package, so this finds the source
+# checkout first and falls back to the installed package
 try:
-    # First try importing from the parent directory
-    sys.path.append(parent_dir)  # Make sure parent_dir is in sys.path
-    from client import LocalLabClient  # Import the client directly
+    from locallab_client import LocalLabClient
 except ImportError as e:
-    try:
-        # Then try the installed package
-        from locallab_client import LocalLabClient
-    except ImportError:
-        print(f"LocalLab client not found: {e}")
-        print("Please install it with: pip install locallab-client")
-        sys.exit(1)
+    print(f"LocalLab client not found: {e}")
+    print("Please install it with: pip install locallab-client")
+    sys.exit(1)
 
 
 async def main():
@@ -17,8 +17,10 @@ from .client import (
     LocalLabError,
     ValidationError,
     RateLimitError,
+    LocalLabHTTPError,
 )
 from .sync_client import SyncLocalLabClient
+from .batching import BatchingGenerator
 
 __version__ = "1.0.8"
 __author__ = "Utkarsh"
@@ -27,6 +29,7 @@ __email__ = "utkarshweb2023@gmail.com"
 __all__ = [
     "LocalLabClient",
     "SyncLocalLabClient",
+    "BatchingGenerator",
     "LocalLabConfig",
     "GenerateOptions",
     "ChatMessage",
@@ -38,4 +41,5 @@ __all__ = [
     "LocalLabError",
     "ValidationError",
     "RateLimitError",
+    "LocalLabHTTPError",
 ]
@@ -0,0 +1,102 @@
+"""
+Client-side request coalescing for LocalLab.
+
+Concurrent ``generate()`` calls that arrive within a short window are merged
+into a single ``/generate/batch`` request, and each caller receives its own
+entry from the batched response.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Set, Tuple
+
+
+class BatchingGenerator:
+    """
+    Merge concurrent generate calls into batched requests.
+
+    Calls are grouped by their generation parameters, since a batch request
+    applies one set of parameters to every prompt. A group is flushed when
+    ``window_ms`` has elapsed since its first call or when it reaches
+    ``max_batch`` prompts, whichever happens first.
+
+    Example:
+        ```python
+        batcher = BatchingGenerator(client, max_batch=32, window_ms=8)
+        results = await asyncio.gather(*(batcher.generate(p) for p in prompts))
+        ```
+    """
+
+    def __init__(self, client, max_batch: int = 32, window_ms: float = 8.0):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self._client = client
+        self.max_batch = max_batch
+        self.window_ms = window_ms
+        self._pending: Dict[Tuple, List[Tuple[str, asyncio.Future]]] = {}
+        self._flush_tasks: Dict[Tuple, asyncio.Task] = {}
+        # Every scheduled flush; the event loop only keeps weak references to tasks
+        self._running: Set[asyncio.Future] = set()
+
+    async def generate(self, prompt: str, **params: Any) -> str:
+        """Queue a prompt for the next batch and wait for its result."""
+        key = tuple(sorted(params.items()))
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((prompt, future))
+
+        if len(batch) >= self.max_batch:
+            # Full batch, send it now instead of waiting for the window
+            task = self._flush_tasks.pop(key, None)
+            if task is not None:
+                task.cancel()
+            self._start(self._flush(key, params))
+        elif key not in self._flush_tasks:
+            self._flush_tasks[key] = self._start(self._flush_after(key, params))
+
+        return await future
+
+    def _start(self, coro) -> asyncio.Future:
+        """Schedule a flush and hold a reference to it until it finishes"""
+        task = asyncio.ensure_future(coro)
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+        return task
+
+    async def _flush_after(self, key: Tuple, params: Dict[str, Any]):
+        """Flush a parameter group once the batching window has elapsed"""
+        await asyncio.sleep(self.window_ms / 1000.0)
+        self._flush_tasks.pop(key, None)
+        await self._flush(key, params)
+
+    async def _flush(self, key: Tuple, params: Dict[str, Any]):
+        """Send one batch request and fan the results back out to the waiters"""
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+
+        try:
+            # One request per coalesced batch, even above batch_generate's chunk size
+            result = await self._client.batch_generate(
+                prompts=[prompt for prompt, _ in batch],
+                chunk_size=len(batch),
+                **params
+            )
+            responses = result["responses"]
+            if len(responses) != len(batch):
+                raise Exception(
+                    f"Batch returned {len(responses)} responses for {len(batch)} prompts"
+                )
+        except asyncio.CancelledError:
+            # Nothing else resolves these futures, so the waiters would hang
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), response in zip(batch, responses):
+            if not future.done():
+                future.set_result(response)
@@ -2,21 +2,122 @@
 Asynchronous client for LocalLab API.
 """
 
-import aiohttp
 import asyncio
-import atexit
+import random
 import weakref
 import warnings
-import threading
 import time
 import logging
-from typing import Optional, AsyncGenerator, Dict, Any, List, Set, ClassVar, Union
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, AsyncGenerator, Dict, Any, List, ClassVar, Tuple, Union
 import json
-import websockets
 from pydantic import BaseModel
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import brotli  # noqa: F401  (enables "br" decoding in aiohttp/httpx)
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+from .batching import BatchingGenerator
+
+if TYPE_CHECKING:
+    from .transport import HTTPXSession
+
 logger = logging.getLogger(__name__)
 
+# aiohttp is heavy to import, so it is loaded when the first client is created
+aiohttp = None
+
+def _load_aiohttp():
+    """Import aiohttp on first use and bind it to the module-level name"""
+    global aiohttp
+    if aiohttp is None:
+        import aiohttp as _aiohttp
+        aiohttp = _aiohttp
+    return aiohttp
+
+# Request bodies are serialized once to bytes with the fastest encoder
+# installed; msgspec also encodes the /generate payload structs below
+if MSGSPEC_AVAILABLE:
+    _json_dumps = msgspec.json.Encoder().encode
+elif ORJSON_AVAILABLE:
+    _json_dumps = orjson.dumps
+else:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+if ORJSON_AVAILABLE:
+    _json_loads = orjson.loads
+else:
+    _json_loads = json.loads
+
+def _drop_none(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Leave unset (None) fields out so the server applies its own defaults"""
+    return {key: value for key, value in payload.items() if value is not None}
+
+if MSGSPEC_AVAILABLE:
+    # With msgspec, /generate payloads are typed structs encoded without an
+    # intermediate dict, and responses decode straight to the fields we read
+    class _GeneratePayload(msgspec.Struct, omit_defaults=True):
+        prompt: str
+        stream: bool
+        temperature: float
+        top_p: float
+        repetition_penalty: float
+        top_k: int
+        do_sample: bool
+        model_id: Optional[str] = None
+        max_length: Optional[int] = None
+        max_time: Optional[float] = None
+
+    class _GenerateResult(msgspec.Struct):
+        response: Optional[str] = None
+        text: Optional[str] = None
+
+    _decode_generate_result = msgspec.json.Decoder(_GenerateResult).decode
+
+    def _generate_payload(**fields: Any) -> Any:
+        return _GeneratePayload(**fields)
+
+    def _parse_generate_response(body: bytes) -> str:
+        result = _decode_generate_result(body)
+        if result.response is not None:
+            return result.response
+        if result.text is not None:
+            return result.text
+        raise Exception(f"Unexpected response format: {body[:200]!r}")
+else:
+    def _generate_payload(**fields: Any) -> Any:
+        return _drop_none(fields)
+
+    def _parse_generate_response(body: bytes) -> str:
+        data = _json_loads(body)
+        # Handle both response formats for backward compatibility
+        if "response" in data:
+            return data["response"]
+        elif "text" in data:
+            return data["text"]
+        raise Exception(f"Unexpected response format: {data}")
+
 # Define response models
 class GenerateOptions(BaseModel):
     """Options for text generation"""
@@ -71,81 +172,206 @@ class RateLimitError(LocalLabError):
     """Rate limit error"""
     pass
 
-# Global registry to track all active client sessions
-_active_clients: Set[weakref.ReferenceType] = set()
-_registry_lock = threading.RLock()
-_cleanup_task = None
-_event_loop = None
-
-# Function to close all active sessions at program exit
-async def _close_all_sessions():
-    """Close all active client sessions"""
-    with _registry_lock:
-        # Make a copy of the set to avoid modification during iteration
-        clients = set(_active_clients)
-
-    for client_ref in clients:
-        client = client_ref()
-        if client is not None and client._session is not None:
-            try:
-                await client.close()
-            except Exception as e:
-                warnings.warn(f"Error closing client session: {e}")
-
-# Register the atexit handler
-def _atexit_handler():
-    """Handle cleanup when the program exits"""
-    # Create a new event loop for the cleanup
-    loop = asyncio.new_event_loop()
+class LocalLabHTTPError(LocalLabError):
+    """Non-success HTTP response from the server"""
+    __slots__ = ("status", "url", "body")
+
+    def __init__(self, status: int, url: str, body: str):
+        super().__init__(f"HTTP {status} from {url}: {body}")
+        self.status = status
+        self.url = url
+        self.body = body
+
+# Gateway-style statuses that indicate the request never reached the model
+_RETRYABLE_STATUSES = frozenset((502, 503, 504))
+
+def _failed_before_send(e: BaseException) -> bool:
+    """True if the connection could not be opened, so the server never saw the request"""
+    if isinstance(e, aiohttp.ClientConnectorError):
+        return True
+    from .transport import HTTPXConnectError
+    return isinstance(e, HTTPXConnectError)
+
+def _backoff_delay(attempt: int, base: float = 0.1, cap: float = 2.0) -> float:
+    """Exponential backoff with jitter for the given zero-based attempt, never above cap"""
+    return min(cap, base * 2 ** attempt * (0.5 + random.random()))
+
+async def _iter_lines(response, chunk_size: int = 65536) -> AsyncGenerator[bytes, None]:
+    """
+    Split a streamed response body into lines.
+
+    Reads the body in large chunks and splits on newlines in a local buffer,
+    instead of going through StreamReader.readline() per line, which also caps
+    line length. Lines are yielded as bytes without the trailing newline.
+    """
+    buffer = bytearray()
+    async for chunk in response.content.iter_chunked(chunk_size):
+        buffer += chunk
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", start)
+            if newline == -1:
+                break
+            yield bytes(buffer[start:newline]).rstrip(b"\r")
+            start = newline + 1
+        if start:
+            del buffer[:start]
+    if buffer:
+        yield bytes(buffer)
+
+def _parse_sse_frame(frame: bytes, decode: bool = True) -> Optional[Tuple[str, Union[str, bytes]]]:
+    """
+    Parse one SSE frame (without its blank-line terminator) into ``(event, data)``.
+
+    With ``decode=False`` the data is returned as raw bytes.
+    """
+    # Fast path: the server sends one data line per token
+    if frame.startswith(b"data: ") and b"\n" not in frame:
+        return "message", frame[6:].decode("utf-8", "replace") if decode else frame[6:]
+
+    event = "message"
+    data_lines: List[bytes] = []
+    for line in frame.split(b"\n"):
+        field, _, value = line.partition(b":")
+        if value.startswith(b" "):
+            value = value[1:]
+        if field == b"data":
+            data_lines.append(value)
+        elif field == b"event":
+            event = value.decode("utf-8", "replace")
+    if not data_lines:
+        return None
+    data = b"\n".join(data_lines)
+    return event, data.decode("utf-8", "replace") if decode else data
+
+async def _iter_sse(response, chunk_size: int = 65536,
+                    decode: bool = True) -> AsyncGenerator[Tuple[str, Union[str, bytes]], None]:
+    """
+    Parse a text/event-stream body into ``(event, data)`` pairs.
+
+    The body is read in large chunks and split into frames on the blank line
+    that ends each one, so a token costs a single generator step rather than
+    one per line. Multiple ``data:`` lines in one frame are joined with
+    newlines, and frames without an ``event:`` field are reported as
+    ``"message"``, as in the SSE spec. Comments and ``id:``/``retry:`` fields
+    are ignored. With ``decode=False`` data is yielded as bytes.
+    """
+    buffer = bytearray()
+    async for chunk in response.content.iter_chunked(chunk_size):
+        buffer += chunk
+        if b"\r" in buffer:
+            buffer = buffer.replace(b"\r\n", b"\n")
+        start = 0
+        while True:
+            end = buffer.find(b"\n\n", start)
+            if end == -1:
+                break
+            parsed = _parse_sse_frame(bytes(buffer[start:end]), decode)
+            start = end + 2
+            if parsed is not None:
+                yield parsed
+        if start:
+            del buffer[:start]
+
+    # Tolerate a final frame without the trailing blank line
+    frame = bytes(buffer).strip(b"\n")
+    if frame:
+        parsed = _parse_sse_frame(frame, decode)
+        if parsed is not None:
+            yield parsed
+
+def _error_chunk(message: str, decode: bool = True) -> Union[str, bytes]:
+    """Format an error for a stream, as str or as bytes for raw streams"""
+    text = f"\nError: {message}"
+    return text if decode else text.encode("utf-8")
+
+def _sse_error_message(data: str) -> str:
+    """Strip the markers the server puts in front of streamed error text"""
+    for prefix in ("[ERROR]", "\\nError:", "Error:"):
+        if data.startswith(prefix):
+            data = data[len(prefix):].lstrip()
+    return data
+
+async def _gather_cancelling(aws) -> list:
+    """gather() that cancels the other awaitables as soon as one fails, like a TaskGroup"""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
     try:
-        loop.run_until_complete(_close_all_sessions())
-    except Exception as e:
-        warnings.warn(f"Error during session cleanup: {e}")
-    finally:
-        loop.close()
-
-# Register the atexit handler
-atexit.register(_atexit_handler)
-
-# Start a background task to periodically check for unused sessions
-def _start_cleanup_task():
-    """Start a background task to clean up unused sessions"""
-    global _cleanup_task, _event_loop
-
-    if _cleanup_task is None or _cleanup_task.done():
-        # Create a new event loop for the background task
-        if _event_loop is None or _event_loop.is_closed():
-            _event_loop = asyncio.new_event_loop()
-
-        async def cleanup_loop():
-            while True:
-                await asyncio.sleep(60)  # Check every minute
-                await _close_all_sessions()
-
-        # Run the cleanup loop in a separate thread
-        def run_cleanup_loop():
-            asyncio.set_event_loop(_event_loop)
-            _event_loop.run_until_complete(cleanup_loop())
-
-        cleanup_thread = threading.Thread(target=run_cleanup_loop, daemon=True)
-        cleanup_thread.start()
-        _cleanup_task = asyncio.Future()
-
-# Initialize the cleanup task
-_start_cleanup_task()
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+def _finalize_session(session, loop: asyncio.AbstractEventLoop,
+                      shared: Optional["_SharedSession"] = None) -> None:
+    """Finalizer for clients that are garbage collected without close()"""
+    if shared is not None:
+        # Give up the slot so the last client to close() still closes the session
+        shared.users -= 1
+    if session.closed:
+        return
+    warnings.warn(
+        "LocalLabClient was garbage collected with an open session. "
+        "Please use 'await client.close()' to properly close the session."
+    )
+    if (shared is None or shared.users == 0) and not loop.is_closed():
+        # Sessions are bound to their loop, so close it there rather than leak sockets
+        loop.call_soon_threadsafe(lambda: loop.create_task(session.close()))
+
+class _SharedSession:
+    """An HTTP session used by every client with the same settings on one event loop"""
+    __slots__ = ("session", "loop", "users", "__weakref__")
+
+    def __init__(self, session, loop: asyncio.AbstractEventLoop):
+        self.session = session
+        self.loop = loop
+        self.users = 0
 
 class LocalLabConfig:
-    def __init__(self, base_url: str, timeout: float = 30.0, headers: Dict[str, str] = {}, api_key: Optional[str] = None):
+    def __init__(self, base_url: str, timeout: float = 30.0, headers: Dict[str, str] = {}, api_key: Optional[str] = None,
+                 transport: str = "aiohttp", batch_window_ms: Optional[float] = None, max_batch: int = 32,
+                 ttl: float = 5.0, share_session: bool = True, user_agent: Optional[str] = None,
+                 max_connections_per_host: int = 32):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.headers = headers
         self.api_key = api_key
+        # "aiohttp" (HTTP/1.1, default) or "httpx" (HTTP/2 multiplexing, needs httpx[http2])
+        if transport not in ("aiohttp", "httpx"):
+            raise ValueError(f"Unknown transport: {transport}")
+        self.transport = transport
+        # When set, concurrent generate() calls within this window are sent as one batch request
+        self.batch_window_ms = batch_window_ms
+        self.max_batch = max_batch
+        # Seconds to reuse model listing/current model responses; 0 disables the cache
+        self.ttl = ttl
+        # Reuse one connection pool across clients with the same URL and credentials
+        self.share_session = share_session
+        if user_agent is None:
+            from . import __version__
+            user_agent = f"locallab-client/{__version__}"
+        self.user_agent = user_agent
+        # Upper bound on parallel requests to the server, e.g. from batch_generate_parallel()
+        if max_connections_per_host < 1:
+            raise ValueError("max_connections_per_host must be at least 1")
+        self.max_connections_per_host = max_connections_per_host
 
 class LocalLabClient:
     """Asynchronous client for the LocalLab API with improved error handling."""
 
-    # Class-level attribute for activity tracking
-    _last_activity_times = {}
+    # Sessions shared between clients, kept alive only by the clients using them
+    _shared_sessions: "weakref.WeakValueDictionary[Tuple, _SharedSession]" = weakref.WeakValueDictionary()
+
+    # Clients are often created per request; slots keep them small
+    __slots__ = (
+        "config",
+        "_url_generate", "_url_chat", "_url_batch", "_url_models_load", "_url_models_current",
+        "_url_models_available", "_url_models_unload", "_url_health", "_url_sysinfo", "_url_ws_generate",
+        "_session", "_shared", "_probe_session", "_json_headers", "_sse_headers",
+        "ws", "_stream_context", "_closed", "_connection_lock",
+        "_finalizer", "_probe_finalizer", "_retry_count", "_max_retries", "_batcher", "_batch_supported", "_cache",
+        "__weakref__",
+    )
 
     def __init__(self, config: Union[str, LocalLabConfig, Dict[str, Any]]):
         if isinstance(config, str):
@@ -154,76 +380,296 @@ class LocalLabClient:
             config = LocalLabConfig(**config)
 
         self.config = config
-        self._session: Optional[aiohttp.ClientSession] = None
-        self.ws: Optional[websockets.WebSocketClientProtocol] = None
+
+        # Endpoint URLs are fixed for the lifetime of the client
+        base_url = config.base_url
+        self._url_generate = base_url + "/generate"
+        self._url_chat = base_url + "/chat"
+        self._url_batch = base_url + "/generate/batch"
+        self._url_models_load = base_url + "/models/load"
+        self._url_models_current = base_url + "/models/current"
+        self._url_models_available = base_url + "/models/available"
+        self._url_models_unload = base_url + "/models/unload"
+        self._url_health = base_url + "/health"
+        self._url_sysinfo = base_url + "/system/info"
+        self._url_ws_generate = base_url + "/ws/generate"
+        _load_aiohttp()
+        self._session: Optional[Union["aiohttp.ClientSession", "HTTPXSession"]] = None
+        self._shared: Optional[_SharedSession] = None
+        self._json_headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        self._sse_headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        # Persistent /ws/generate connection, opened by ws_stream_generate()
+        self.ws: Optional["aiohttp.ClientWebSocketResponse"] = None
         self._stream_context = []
         self._closed = False
-        self._connection_lock = asyncio.Lock()
-        self._last_activity = time.time()
+        # Created on first use so it binds to the loop the client runs on
+        self._connection_lock: Optional[asyncio.Lock] = None
+        self._finalizer: Optional[weakref.finalize] = None
         self._retry_count = 0
         self._max_retries = 3
+        self._batcher: Optional[BatchingGenerator] = None
+        if config.batch_window_ms is not None:
+            self._batcher = BatchingGenerator(self, max_batch=config.max_batch, window_ms=config.batch_window_ms)
+        # Cleared once the server turns out not to have /generate/batch
+        self._batch_supported = True
+        # Polled GET endpoints: url -> (expiry, value, etag)
+        self._cache: Dict[str, Tuple[float, Any, Optional[str]]] = {}
+        # Separate small pool for health_check(), created on first use
+        self._probe_session: Optional[Union["aiohttp.ClientSession", "HTTPXSession"]] = None
+        self._probe_finalizer: Optional[weakref.finalize] = None
 
     async def connect(self):
         """Initialize HTTP session with improved error handling."""
         if self._closed:
             raise RuntimeError("Client is closed")
 
-        if not self._session:
-            try:
-                headers = {
-                    "Content-Type": "application/json",
-                    **self.config.headers,
-                }
-                if self.config.api_key:
-                    headers["Authorization"] = f"Bearer {self.config.api_key}"
-
-                self._session = aiohttp.ClientSession(
+        if not self._session_live():
+            await self._open_session()
+
+    def _session_live(self) -> bool:
+        """Whether the current session can take requests without reopening"""
+        session = self._session
+        return session is not None and not session.closed
+
+    async def _open_session(self):
+        """
+        Create the HTTP session, or join the shared one for these settings.
+
+        Request methods check ``_session_live()`` inline and only await this on
+        the first request (or after the session was closed underneath them),
+        keeping the steady-state path free of a coroutine call.
+        """
+        if self._closed:
+            raise RuntimeError("Client is closed")
+
+        if self._finalizer is not None:
+            self._finalizer.detach()
+        if self._shared is not None:
+            # Give up our slot in a shared session that has gone away
+            self._shared.users -= 1
+            self._shared = None
+
+        if not self.config.share_session:
+            self._session = self._create_session()
+            self._track_session()
+            return self._session
+
+        # Sessions are bound to their event loop and carry the auth headers and
+        # default timeout, so only clients that agree on all of these can share one
+        loop = asyncio.get_running_loop()
+        key = (
+            self.config.base_url,
+            self.config.transport,
+            self.config.timeout,
+            self.config.api_key,
+            self.config.user_agent,
+            self.config.max_connections_per_host,
+            tuple(sorted(self.config.headers.items())),
+            id(loop),
+        )
+        shared = LocalLabClient._shared_sessions.get(key)
+        if shared is None or shared.loop is not loop or shared.session.closed:
+            shared = _SharedSession(self._create_session(), loop)
+            LocalLabClient._shared_sessions[key] = shared
+        shared.users += 1
+        self._shared = shared
+        self._session = shared.session
+        self._track_session()
+        return self._session
+
+    def _track_session(self):
+        """Warn about and close the session if this client is garbage collected without close()"""
+        # The finalizer holds the session, never self, so it doesn't keep the client alive
+        self._finalizer = weakref.finalize(
+            self, _finalize_session, self._session, asyncio.get_running_loop(), self._shared
+        )
+        self._finalizer.atexit = False
+
+    def _session_headers(self) -> Dict[str, str]:
+        """Default headers sent with every request"""
+        headers = {
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+            "User-Agent": self.config.user_agent,
+            # Batch, model list and system info bodies are highly compressible JSON
+            "Accept-Encoding": "gzip, deflate, br" if BROTLI_AVAILABLE else "gzip, deflate",
+            **self.config.headers,
+        }
+        if self.config.api_key:
+            headers["Authorization"] = f"Bearer {self.config.api_key}"
+        return headers
+
+    def _create_session(self):
+        """Build a new HTTP session for the configured transport"""
+        try:
+            headers = self._session_headers()
+
+            if self.config.transport == "httpx":
+                from .transport import HTTPXSession
+
+                # One HTTP/2 connection multiplexes all concurrent requests
+                return HTTPXSession(
                     headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=self.config.timeout),
+                    timeout=self.config.timeout,
+                    max_connections_per_host=self.config.max_connections_per_host,
                 )
-            except Exception as e:
-                logger.error(f"Failed to create session: {str(e)}")
-                raise ConnectionError(f"Failed to create session: {str(e)}")
+
+            # Keep idle connections around long enough to be reused between calls
+            # (the server keeps them for 125s, so the client always closes first),
+            # and cap per-host sockets so bursts can't exhaust file descriptors
+            connector = aiohttp.TCPConnector(
+                limit=max(100, self.config.max_connections_per_host),
+                limit_per_host=self.config.max_connections_per_host,
+                keepalive_timeout=120,
+                enable_cleanup_closed=True,
+                ttl_dns_cache=300,
+                force_close=False,
+            )
+            # The session owns the connector and closes it with itself
+            return aiohttp.ClientSession(
+                headers=headers,
+                timeout=self._timeout(self.config.timeout),
+                connector=connector,
+                auto_decompress=True,
+                # Let large batch bodies buffer without pausing the socket every 128KiB
+                read_bufsize=1 << 18,
+            )
+        except Exception as e:
+            logger.error(f"Failed to create session: {str(e)}")
+            raise ConnectionError(f"Failed to create session: {str(e)}")
 
     async def close(self):
         """Close all connections with proper cleanup."""
         if not self._closed:
             try:
-                if self._session:
-                    await self._session.close()
-                    self._session = None
                 if self.ws:
                     await self.ws.close()
                     self.ws = None
+                if self._shared is not None:
+                    # A shared session is closed by the last client using it
+                    shared, self._shared = self._shared, None
+                    shared.users -= 1
+                    if shared.users == 0:
+                        await shared.session.close()
+                    self._session = None
+                elif self._session:
+                    await self._session.close()
+                    self._session = None
+                if self._probe_session is not None:
+                    await self._probe_session.close()
+                    self._probe_session = None
             except Exception as e:
                 logger.error(f"Error during close: {str(e)}")
             finally:
+                if self._finalizer is not None:
+                    self._finalizer.detach()
+                    self._finalizer = None
+                if self._probe_finalizer is not None:
+                    self._probe_finalizer.detach()
+                    self._probe_finalizer = None
                 self._closed = True
 
-    def _update_activity(self):
-        """Update the last activity time for this client"""
-        LocalLabClient._last_activity_times[id(self)] = time.time()
-
-    @classmethod
-    def _cleanup_callback(cls, ref):
-        """Callback when a client is garbage collected"""
-        with _registry_lock:
-            if ref in _active_clients:
-                _active_clients.remove(ref)
-
-        # Remove from activity times
-        client_id = id(ref)
-        if client_id in cls._last_activity_times:
-            del cls._last_activity_times[client_id]
-
-    def __del__(self):
-        """Attempt to close the session when the client is garbage collected"""
-        if not self._closed and self._session is not None:
-            # We can't await in __del__, so just issue a warning
-            warnings.warn(
-                "LocalLabClient was garbage collected with an open session. "
-                "Please use 'await client.close()' to properly close the session."
-            )
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _timeout(total: float) -> "aiohttp.ClientTimeout":
+        """Return a shared ClientTimeout for the given total; they are immutable"""
+        return aiohttp.ClientTimeout(total=total)
+
+    async def _with_retry(self, coro_factory, *, retries: Optional[int] = None,
+                          base: float = 0.1, cap: float = 2.0, idempotent: bool = True):
+        """
+        Await ``coro_factory()``, retrying transient failures with jittered backoff.
+
+        Dropped keep-alive connections, timeouts and 502/503/504 responses are
+        retried; anything else propagates immediately. When ``idempotent`` is
+        False (POSTs that run a model) only failures to connect are retried,
+        since after a timeout or 5xx the server may still be doing the work.
+        """
+        if retries is None:
+            retries = self._max_retries
+        for attempt in range(retries):
+            try:
+                return await coro_factory()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError, LocalLabHTTPError) as e:
+                if isinstance(e, LocalLabHTTPError) and e.status not in _RETRYABLE_STATUSES:
+                    raise
+                if not idempotent and not _failed_before_send(e):
+                    raise
+                if attempt == retries - 1:
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt, base, cap))
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        error_message: str,
+        payload: Any = None,
+        timeout: float = 30.0,
+        parse=_json_loads,
+        cached: bool = False
+    ) -> Any:
+        """
+        Send a non-streaming request with retries and return the parsed body.
+
+        ``parse`` turns the raw response body into the return value. GETs with
+        ``cached=True`` go through the short-lived response cache. Transport
+        errors become the generic exceptions the public methods have always
+        raised, prefixed with ``error_message``; LocalLabError passes through.
+        ``payload`` is serialized inside the same handling, so an argument that
+        can't be encoded fails the way the request itself would.
+        """
+        request_timeout = self._timeout(timeout)
+        body = None
+
+        async def attempt():
+            if cached:
+                return await self._get_json_cached(url, request_timeout)
+            if not self._session_live():
+                await self._open_session()
+            if method == "GET":
+                request = self._session.get(url, timeout=request_timeout)
+            else:
+                request = self._post_json(url, body, request_timeout)
+            async with request as response:
+                await self._raise_for_status(response, url)
+                raw = await response.read()
+            try:
+                return parse(raw)
+            except Exception as e:
+                # Handle JSON parsing errors
+                raise Exception(f"Failed to parse response: {str(e)}")
+
+        try:
+            if payload is not None:
+                # Serialized once and reused by every retry
+                body = _json_dumps(payload)
+            return await self._with_retry(attempt, idempotent=method == "GET")
+        except asyncio.TimeoutError:
+            raise Exception("Request timed out. The server took too long to respond.")
+        except aiohttp.ClientError as e:
+            raise Exception(f"Connection error: {str(e)}")
+        except (LocalLabError, asyncio.CancelledError):
+            # CancelledError is an Exception before Python 3.8
+            raise
+        except Exception as e:
+            raise Exception(f"{error_message}: {str(e)}")
+
+    async def _raise_for_status(self, response, url: str):
+        """Raise LocalLabHTTPError for a non-200 response, reading at most 4 KiB of the body"""
+        if response.status != 200:
+            body = (await response.content.read(4096)).decode("utf-8", "replace")
+            raise LocalLabHTTPError(response.status, url, body)
+
+    def _post_json(self, url: str, body: bytes, timeout: "aiohttp.ClientTimeout",
+                   headers: Optional[Dict[str, str]] = None):
+        """POST a JSON body already serialized with _json_dumps"""
+        return self._session.post(
+            url,
+            data=body,
+            headers=headers or self._json_headers,
+            timeout=timeout
+        )
 
     async def generate(
         self,
@@ -258,25 +704,6 @@ class LocalLabClient:
         Returns:
             The generated text as a string.
         """
-        # Update activity timestamp
-        self._update_activity()
-
-        payload = {
-            "prompt": prompt,
-            "model_id": model_id,
-            "stream": stream,
-            "max_length": max_length,
-            "temperature": temperature,
-            "top_p": top_p,
-            "repetition_penalty": repetition_penalty,
-            "top_k": top_k,
-            "do_sample": do_sample
-        }
-
-        # Add max_time parameter if provided
-        if max_time is not None:
-            payload["max_time"] = max_time
-
         if stream:
             return self.stream_generate(
                 prompt=prompt,
@@ -290,38 +717,36 @@ class LocalLabClient:
                 do_sample=do_sample
             )
 
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
-
-        try:
-            await self.connect()
-            async with self._session.post(
-                f"{self.config.base_url}/generate",
-                json=payload,
-                timeout=request_timeout
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Generation failed: {error_text}")
+        # Coalesce with other concurrent calls; the batch endpoint has no model_id or do_sample override
+        if self._batcher is not None and self._batch_supported and model_id is None and do_sample:
+            return await self._batcher.generate(
+                prompt,
+                max_length=max_length,
+                temperature=temperature,
+                top_p=top_p,
+                timeout=timeout,
+                repetition_penalty=repetition_penalty,
+                top_k=top_k,
+                max_time=max_time
+            )
 
-                try:
-                    data = await response.json()
-                    # Handle both response formats for backward compatibility
-                    if "response" in data:
-                        return data["response"]
-                    elif "text" in data:
-                        return data["text"]
-                    else:
-                        raise Exception(f"Unexpected response format: {data}")
-                except Exception as e:
-                    # Handle JSON parsing errors
-                    raise Exception(f"Failed to parse response: {str(e)}")
-        except asyncio.TimeoutError:
-            raise Exception("Request timed out. The server took too long to respond.")
-        except aiohttp.ClientError as e:
-            raise Exception(f"Connection error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Generation failed: {str(e)}")
+        payload = _generate_payload(
+            prompt=prompt,
+            model_id=model_id,
+            stream=stream,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            repetition_penalty=repetition_penalty,
+            top_k=top_k,
+            do_sample=do_sample,
+            max_time=max_time
+        )
+
+        return await self._request(
+            "POST", self._url_generate, "Generation failed",
+            payload=payload, timeout=timeout, parse=_parse_generate_response
+        )
 
     async def stream_generate(
         self,
@@ -335,8 +760,10 @@ class LocalLabClient:
         repetition_penalty: float = 1.15,  # Increased repetition penalty for better quality
         top_k: int = 80,  # Added top_k parameter for better quality
         do_sample: bool = True,  # Added do_sample parameter
-        max_time: Optional[float] = None  # Added max_time parameter to limit generation time
-    ) -> AsyncGenerator[str, None]:
+        max_time: Optional[float] = None,  # Added max_time parameter to limit generation time
+        chunk_tokens: int = 1,
+        decode: bool = True
+    ) -> AsyncGenerator[Union[str, bytes], None]:
         """
         Stream text generation with token-level streaming and robust error handling.
 
@@ -352,132 +779,153 @@ class LocalLabClient:
             top_k: Top-k for sampling (higher values = more diverse vocabulary)
             do_sample: Whether to use sampling instead of greedy decoding
             max_time: Optional maximum time in seconds to spend generating (server-side timeout, defaults to 180 seconds if not provided)
+            chunk_tokens: Number of tokens to join into each yielded chunk (1 yields every token as it arrives)
+            decode: Yield str chunks; False yields the raw UTF-8 bytes (including error messages) for passthrough consumers
 
         Returns:
             A generator that yields chunks of text as they are generated.
         """
-        # Update activity timestamp
-        self._update_activity()
+        if chunk_tokens < 1:
+            raise ValueError("chunk_tokens must be at least 1")
 
         # Use a higher max_length by default to ensure complete responses
         if max_length is None:
             max_length = 8192  # Default to 8192 tokens to match server's default
 
-        payload = {
-            "prompt": prompt,
-            "model_id": model_id,
-            "stream": True,
-            "max_length": max_length,
-            "temperature": temperature,
-            "top_p": top_p,
-            "repetition_penalty": repetition_penalty,
-            "top_k": top_k,
-            "do_sample": do_sample
-        }
-
-        # Add max_time parameter if provided
-        if max_time is not None:
-            payload["max_time"] = max_time
-
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
+        payload = _generate_payload(
+            prompt=prompt,
+            model_id=model_id,
+            stream=True,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            repetition_penalty=repetition_penalty,
+            top_k=top_k,
+            do_sample=do_sample,
+            max_time=max_time
+        )
+
+        # Reuse the cached timeout object for this total
+        request_timeout = self._timeout(timeout)
 
         # Track retries
         retries = 0
         last_error = None
-        accumulated_text = ""  # Track accumulated text for error recovery
+        received_text = False  # Whether any output reached the caller, for error recovery
+        # Markers and joins match the chunk type the caller asked for
+        if decode:
+            done_marker, error_marker, empty = "[DONE]", "[ERROR]", ""
+        else:
+            done_marker, error_marker, empty = b"[DONE]", b"[ERROR]", b""
+
+        # Serialized once and reused by every retry
+        try:
+            body = _json_dumps(payload)
+        except Exception as e:
+            # An argument that can't be encoded is reported like a failed request
+            yield _error_chunk(str(e), decode)
+            return
 
         while retries <= retry_count:
             try:
-                await self.connect()
-                async with self._session.post(
-                    f"{self.config.base_url}/generate",
-                    json=payload,
-                    timeout=request_timeout
+                if not self._session_live():
+                    await self._open_session()
+                async with self._post_json(
+                    self._url_generate,
+                    body,
+                    request_timeout,
+                    headers=self._sse_headers
                 ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise Exception(f"Streaming failed: {error_text}")
+                    await self._raise_for_status(response, self._url_generate)
 
-                    # Track if we've seen any data to detect early disconnections
-                    received_data = False
-                    # Buffer for accumulating partial responses if needed
-                    token_buffer = ""
-                    last_token_time = time.time()
+                    # Tokens held back until chunk_tokens of them can be yielded together
+                    token_buffer: List[Union[str, bytes]] = []
 
                     try:
                         # Process the streaming response
-                        async for line in response.content:
-                            if line:
-                                received_data = True
-                                current_time = time.time()
-                                text = line.decode("utf-8").strip()
-
-                                # Skip empty lines
-                                if not text:
-                                    continue
-
-                                # Handle SSE format (data: prefix)
-                                if text.startswith("data: "):
-                                    text = text[6:]  # Remove "data: " prefix
-
-                                # Check for end of stream marker
-                                if text == "[DONE]":
-                                    # If we have any buffered text, yield it before ending
-                                    if token_buffer:
-                                        yield token_buffer
-                                    break
-
-                                # Check for error messages
-                                if text.startswith("\nError:") or text.startswith("Error:"):
-                                    error_msg = text.replace("\nError: ", "").replace("Error: ", "")
-                                    raise Exception(error_msg)
-
-                                # Add to accumulated text for error recovery
-                                accumulated_text += text
-
-                                # Reset the last token time
-                                last_token_time = current_time
-
+                        async for event, data in _iter_sse(response, decode=decode):
+                            # Check for end of stream marker
+                            if data == done_marker:
+                                # If we have any buffered text, yield it before ending
+                                if token_buffer:
+                                    yield empty.join(token_buffer)
+                                break
+
+                            # Errors arrive as their own event type; older servers
+                            # only mark the data with an [ERROR] prefix
+                            if event == "error" or data.startswith(error_marker):
+                                if not decode:
+                                    data = data.decode("utf-8", "replace")
+                                raise Exception(_sse_error_message(data))
+
+                            if not received_text:
+                                # Set once; a plain assignment would run for every token
+                                received_text = True
+
+                            if chunk_tokens == 1:
                                 # Yield the token directly for immediate feedback
-                                yield text
+                                yield data
+                                continue
 
-                        # If we didn't receive any data, the stream might have ended unexpectedly
-                        if not received_data:
-                            # If we have accumulated text from previous attempts, don't report an error
-                            if not accumulated_text:
-                                yield "\nError: Stream ended unexpectedly without returning any data"
+                            token_buffer.append(data)
+                            if len(token_buffer) >= chunk_tokens:
+                                yield empty.join(token_buffer)
+                                token_buffer.clear()
+                        else:
+                            if token_buffer:
+                                yield empty.join(token_buffer)
+                            # The stream closed without [DONE]; only an error if nothing arrived
+                            if not received_text:
+                                yield _error_chunk("Stream ended unexpectedly without returning any data", decode)
 
                         # Successful completion, break the retry loop
                         break
 
                     except asyncio.TimeoutError:
-                        # For timeout during streaming, we'll retry
+                        # Retry only if nothing was yielded yet, otherwise the caller
+                        # would see the output twice
                         last_error = "Stream timed out. The server took too long to respond."
                         retries += 1
-                        if retries > retry_count:
-                            yield f"\nError: {last_error}"
+                        if received_text or retries > retry_count:
+                            if token_buffer:
+                                yield empty.join(token_buffer)
+                            yield _error_chunk(last_error, decode)
+                            break
+                        await asyncio.sleep(_backoff_delay(retries - 1))
                         continue
 
-                    except Exception as stream_error:
-                        # For other streaming errors, yield the error and break
-                        error_msg = str(stream_error)
-                        if "timeout" in error_msg.lower():
-                            last_error = "Stream timed out. The server took too long to respond."
-                            retries += 1
-                            if retries > retry_count:
-                                yield f"\nError: {last_error}"
-                            continue
-                        else:
-                            yield f"\nError: {error_msg}"
+                    except (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError) as stream_error:
+                        # The connection dropped mid-stream; same retry rule as a timeout
+                        last_error = f"Connection lost: {stream_error}"
+                        retries += 1
+                        if received_text or retries > retry_count:
+                            if token_buffer:
+                                yield empty.join(token_buffer)
+                            yield _error_chunk(last_error, decode)
                             break
+                        await asyncio.sleep(_backoff_delay(retries - 1))
+                        continue
+
+                    except asyncio.CancelledError:
+                        raise
+
+                    except Exception as stream_error:
+                        # Timeouts (including aiohttp.ServerTimeoutError) and dropped
+                        # connections are handled above; anything else is reported
+                        # once and ends the stream
+                        if token_buffer:
+                            yield empty.join(token_buffer)
+                        yield _error_chunk(str(stream_error), decode)
+                        break
 
             except asyncio.TimeoutError:
                 # For connection timeout, we'll retry
                 last_error = "Connection timed out. The server took too long to respond."
                 retries += 1
                 if retries > retry_count:
-                    yield f"\nError: {last_error}"
+                    yield _error_chunk(last_error, decode)
+                    break
+                await asyncio.sleep(_backoff_delay(retries - 1))
                 continue
 
             except aiohttp.ClientError as e:
@@ -485,14 +933,117 @@ class LocalLabClient:
                 last_error = f"Connection error: {str(e)}"
                 retries += 1
                 if retries > retry_count:
-                    yield f"\nError: {last_error}"
+                    yield _error_chunk(last_error, decode)
+                    break
+                await asyncio.sleep(_backoff_delay(retries - 1))
                 continue
 
+            except asyncio.CancelledError:
+                raise
+
             except Exception as e:
                 # For other errors, yield the error and break
-                yield f"\nError: {str(e)}"
+                yield _error_chunk(str(e), decode)
                 break
 
+    async def ws_stream_generate(
+        self,
+        prompt: str,
+        model_id: Optional[str] = None,
+        max_length: Optional[int] = None,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        repetition_penalty: float = 1.15,
+        top_k: int = 80,
+        do_sample: bool = True,
+        max_time: Optional[float] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream text generation over a persistent WebSocket.
+
+        The connection to /ws/generate is opened on first use and reused by
+        later calls, so back-to-back generations skip the per-request HTTP
+        round trip. Concurrent calls each get their own socket; one idle
+        socket is kept for reuse. Requires the aiohttp transport.
+
+        Args:
+            prompt: The prompt to generate text from
+            model_id: Optional model ID to use
+            max_length: Maximum length of the generated text
+            temperature: Temperature for sampling
+            top_p: Top-p for nucleus sampling
+            repetition_penalty: Penalty for repetition (higher values = less repetition)
+            top_k: Top-k for sampling (higher values = more diverse vocabulary)
+            do_sample: Whether to use sampling instead of greedy decoding
+            max_time: Optional maximum time in seconds to spend generating
+
+        Returns:
+            A generator that yields chunks of text as they are generated.
+        """
+        if self.config.transport != "aiohttp":
+            raise LocalLabError("WebSocket streaming requires the aiohttp transport")
+
+        try:
+            body = _json_dumps(_generate_payload(
+                prompt=prompt,
+                model_id=model_id,
+                stream=True,
+                max_length=max_length,
+                temperature=temperature,
+                top_p=top_p,
+                repetition_penalty=repetition_penalty,
+                top_k=top_k,
+                do_sample=do_sample,
+                max_time=max_time
+            ))
+        except Exception as e:
+            yield f"\nError: {str(e)}"
+            return
+
+        if self._connection_lock is None:
+            self._connection_lock = asyncio.Lock()
+
+        ws = None
+        finished = False
+        try:
+            try:
+                # The lock only covers taking or opening the socket, so a paused
+                # consumer never holds up other calls, connect() or close()
+                async with self._connection_lock:
+                    # Take the idle socket so concurrent calls never share one
+                    ws, self.ws = self.ws, None
+                    if ws is None or ws.closed:
+                        if not self._session_live():
+                            await self._open_session()
+                        ws = await self._session.ws_connect(self._url_ws_generate, heartbeat=30)
+                await ws.send_bytes(body)
+            except asyncio.TimeoutError:
+                yield "\nError: Connection timed out. The server took too long to respond."
+                return
+            except aiohttp.ClientError as e:
+                yield f"\nError: Connection error: {str(e)}"
+                return
+
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                if message.data == "[DONE]":
+                    finished = True
+                    return
+                if message.data.startswith("[ERROR]"):
+                    finished = True
+                    yield f"\nError: {_sse_error_message(message.data)}"
+                    return
+                yield message.data
+            yield "\nError: Connection closed before the generation finished"
+        finally:
+            if finished and self.ws is None and not self._closed:
+                # Keep the socket for the next call
+                self.ws = ws
+            elif ws is not None:
+                # Unread tokens would leak into the next call, so drop the connection
+                await ws.close()
+
     async def chat(
         self,
         messages: List[Dict[str, str]],
@@ -524,24 +1075,6 @@ class LocalLabClient:
         Returns:
             The chat completion response as a dictionary.
         """
-        # Update activity timestamp
-        self._update_activity()
-
-        payload = {
-            "messages": messages,
-            "model_id": model_id,
-            "stream": stream,
-            "max_length": max_length,
-            "temperature": temperature,
-            "top_p": top_p,
-            "repetition_penalty": repetition_penalty,
-            "top_k": top_k
-        }
-
-        # Add max_time parameter if provided
-        if max_time is not None:
-            payload["max_time"] = max_time
-
         if stream:
             return self.stream_chat(
                 messages=messages,
@@ -554,31 +1087,22 @@ class LocalLabClient:
                 top_k=top_k
             )
 
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
-
-        try:
-            await self.connect()
-            async with self._session.post(
-                f"{self.config.base_url}/chat",
-                json=payload,
-                timeout=request_timeout
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Chat completion failed: {error_text}")
+        payload = _drop_none({
+            "messages": messages,
+            "model_id": model_id,
+            "stream": stream,
+            "max_length": max_length,
+            "temperature": temperature,
+            "top_p": top_p,
+            "repetition_penalty": repetition_penalty,
+            "top_k": top_k,
+            "max_time": max_time
+        })
 
-                try:
-                    return await response.json()
-                except Exception as e:
-                    # Handle JSON parsing errors
-                    raise Exception(f"Failed to parse response: {str(e)}")
-        except asyncio.TimeoutError:
-            raise Exception("Request timed out. The server took too long to respond.")
-        except aiohttp.ClientError as e:
-            raise Exception(f"Connection error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Chat completion failed: {str(e)}")
+        return await self._request(
+            "POST", self._url_chat, "Chat completion failed",
+            payload=payload, timeout=timeout
+        )
 
     async def stream_chat(
         self,
@@ -611,10 +1135,7 @@ class LocalLabClient:
         Returns:
             A generator that yields chunks of the chat completion response.
         """
-        # Update activity timestamp
-        self._update_activity()
-
-        payload = {
+        payload = _drop_none({
             "messages": messages,
             "model_id": model_id,
             "stream": True,
@@ -622,61 +1143,68 @@ class LocalLabClient:
             "temperature": temperature,
             "top_p": top_p,
             "repetition_penalty": repetition_penalty,
-            "top_k": top_k
-        }
-
-        # Add max_time parameter if provided
-        if max_time is not None:
-            payload["max_time"] = max_time
+            "top_k": top_k,
+            "max_time": max_time
+        })
 
         # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
+        request_timeout = self._timeout(timeout)
 
         # Track retries
         retries = 0
         last_error = None
 
+        # Serialized once and reused by every retry
+        try:
+            body = _json_dumps(payload)
+        except Exception as e:
+            # An argument that can't be encoded is reported like a failed request
+            yield {"error": str(e)}
+            return
+
         while retries <= retry_count:
             try:
-                await self.connect()
-                async with self._session.post(
-                    f"{self.config.base_url}/chat",
-                    json=payload,
-                    timeout=request_timeout
+                if not self._session_live():
+                    await self._open_session()
+                async with self._post_json(
+                    self._url_chat,
+                    body,
+                    request_timeout
                 ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise Exception(f"Chat streaming failed: {error_text}")
+                    await self._raise_for_status(response, self._url_chat)
 
                     # Track if we've seen any data to detect early disconnections
                     received_data = False
 
                     try:
                         # Process the streaming response
-                        async for line in response.content:
-                            if line:
-                                received_data = True
-                                text = line.decode("utf-8").strip()
+                        async for line in _iter_lines(response):
+                            received_data = True
 
-                                # Skip empty lines
-                                if not text:
-                                    continue
+                            # Skip empty lines
+                            if not line:
+                                continue
 
+                            # Only try to decode lines that can start a JSON value we
+                            # expect; raw text lines would just raise and be caught
+                            if line[:1] in b'{["':
                                 try:
-                                    data = json.loads(text)
-
+                                    data = _json_loads(line)
+                                except json.JSONDecodeError:
+                                    pass
+                                else:
                                     # Check for end of stream marker
                                     if data == "[DONE]":
                                         break
 
                                     yield data
-                                except json.JSONDecodeError:
-                                    # Handle non-JSON responses
-                                    if text.startswith("\nError:") or text.startswith("Error:"):
-                                        error_msg = text.replace("\nError: ", "").replace("Error: ", "")
-                                        raise Exception(error_msg)
                                     continue
 
+                            # Handle non-JSON responses; only error lines are decoded
+                            if line.startswith((b"Error:", b"\nError:")):
+                                error_msg = line.decode("utf-8", "ignore")
+                                raise Exception(_sse_error_message(error_msg))
+
                         # If we didn't receive any data, the stream might have ended unexpectedly
                         if not received_data:
                             yield {"error": "Stream ended unexpectedly without returning any data"}
@@ -685,25 +1213,35 @@ class LocalLabClient:
                         break
 
                     except asyncio.TimeoutError:
-                        # For timeout during streaming, we'll retry
+                        # Retry only if nothing arrived yet, otherwise the caller
+                        # would see the output twice
                         last_error = "Stream timed out. The server took too long to respond."
                         retries += 1
-                        if retries > retry_count:
+                        if received_data or retries > retry_count:
                             yield {"error": last_error}
+                            break
+                        await asyncio.sleep(_backoff_delay(retries - 1))
                         continue
 
-                    except Exception as stream_error:
-                        # For other streaming errors, yield the error and break
-                        error_msg = str(stream_error)
-                        if "timeout" in error_msg.lower():
-                            last_error = "Stream timed out. The server took too long to respond."
-                            retries += 1
-                            if retries > retry_count:
-                                yield {"error": last_error}
-                            continue
-                        else:
-                            yield {"error": error_msg}
+                    except (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError) as stream_error:
+                        # The connection dropped mid-stream; same retry rule as a timeout
+                        last_error = f"Connection lost: {stream_error}"
+                        retries += 1
+                        if received_data or retries > retry_count:
+                            yield {"error": last_error}
                             break
+                        await asyncio.sleep(_backoff_delay(retries - 1))
+                        continue
+
+                    except asyncio.CancelledError:
+                        raise
+
+                    except Exception as stream_error:
+                        # Timeouts (including aiohttp.ServerTimeoutError) and dropped
+                        # connections are handled above; anything else is reported
+                        # once and ends the stream
+                        yield {"error": str(stream_error)}
+                        break
 
             except asyncio.TimeoutError:
                 # For connection timeout, we'll retry
@@ -711,6 +1249,8 @@ class LocalLabClient:
                 retries += 1
                 if retries > retry_count:
                     yield {"error": last_error}
+                    break
+                await asyncio.sleep(_backoff_delay(retries - 1))
                 continue
 
             except aiohttp.ClientError as e:
@@ -719,8 +1259,13 @@ class LocalLabClient:
                 retries += 1
                 if retries > retry_count:
                     yield {"error": last_error}
+                    break
+                await asyncio.sleep(_backoff_delay(retries - 1))
                 continue
 
+            except asyncio.CancelledError:
+                raise
+
             except Exception as e:
                 # For other errors, yield the error and break
                 yield {"error": str(e)}
@@ -736,11 +1281,18 @@ class LocalLabClient:
         timeout: float = 300.0,  # Increased timeout for more complete responses (5 minutes)
         repetition_penalty: float = 1.15,  # Added repetition penalty for better quality
         top_k: int = 80,  # Added top_k parameter for better quality
-        max_time: Optional[float] = None  # Added max_time parameter to limit generation time
+        max_time: Optional[float] = None,  # Added max_time parameter to limit generation time
+        chunk_size: int = 16,  # Maximum prompts per batch request
+        max_in_flight: int = 8  # Maximum concurrent batch requests
     ) -> Dict[str, List[str]]:
         """
         Generate text for multiple prompts in parallel with improved error handling.
 
+        Prompt lists longer than chunk_size are split into sub-batches that are
+        sent concurrently (at most max_in_flight at a time). Servers without
+        /generate/batch get one concurrent /generate request per prompt
+        instead. Responses are returned in the same order as the prompts.
+
         Args:
             prompts: List of prompts to generate text from
             model_id: Optional model ID to use
@@ -751,222 +1303,435 @@ class LocalLabClient:
             repetition_penalty: Penalty for repetition (higher values = less repetition)
             top_k: Top-k for sampling (higher values = more diverse vocabulary)
             max_time: Optional maximum time in seconds to spend generating (server-side timeout, defaults to 180 seconds if not provided)
+            chunk_size: Maximum number of prompts sent in a single batch request
+            max_in_flight: Maximum number of batch requests in flight at once
 
         Returns:
             Dictionary with the generated responses.
         """
-        # Update activity timestamp
-        self._update_activity()
+        if chunk_size < 1 or max_in_flight < 1:
+            raise ValueError("chunk_size and max_in_flight must be at least 1")
 
-        payload = {
-            "prompts": prompts,
+        payload = _drop_none({
             "model_id": model_id,
             "max_length": max_length,
             "temperature": temperature,
             "top_p": top_p,
             "repetition_penalty": repetition_penalty,
-            "top_k": top_k
-        }
+            "top_k": top_k,
+            "max_time": max_time
+        })
 
-        # Add max_time parameter if provided
-        if max_time is not None:
-            payload["max_time"] = max_time
+        if self._batch_supported:
+            try:
+                return await self._batch_via_endpoint(prompts, payload, timeout, chunk_size, max_in_flight)
+            except LocalLabHTTPError as e:
+                if e.status not in (404, 405):
+                    raise
+                # Older servers have no /generate/batch; remember that and fan out instead
+                self._batch_supported = False
+
+        results = await self.batch_generate_parallel(
+            prompts,
+            max_concurrency=self.config.max_connections_per_host,
+            model_id=model_id,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            timeout=timeout,
+            repetition_penalty=repetition_penalty,
+            top_k=top_k,
+            max_time=max_time
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return {"responses": results}
+
+    async def _batch_via_endpoint(
+        self,
+        prompts: List[str],
+        payload: Dict[str, Any],
+        timeout: float,
+        chunk_size: int,
+        max_in_flight: int
+    ) -> Dict[str, List[str]]:
+        """Send prompts to /generate/batch, split into concurrent chunks when needed"""
+        if len(prompts) <= chunk_size:
+            return await self._post_batch(prompts, payload, timeout)
 
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
+        # Keep each request in the server's efficient batch size and overlap
+        # several of them on the wire instead of sending one huge batch
+        semaphore = asyncio.Semaphore(max_in_flight)
 
-        try:
-            await self.connect()
-            async with self._session.post(
-                f"{self.config.base_url}/generate/batch",
-                json=payload,
-                timeout=request_timeout
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Batch generation failed: {error_text}")
+        async def run_chunk(chunk: List[str]) -> Dict[str, List[str]]:
+            async with semaphore:
+                return await self._post_batch(chunk, payload, timeout)
+
+        chunks = [prompts[i:i + chunk_size] for i in range(0, len(prompts), chunk_size)]
+        # Results come back in submission order, so prompt order is preserved;
+        # a failed chunk cancels the rest instead of leaving them running
+        results = await _gather_cancelling(run_chunk(chunk) for chunk in chunks)
+        return {"responses": [text for result in results for text in result["responses"]]}
+
+    async def iter_batch_generate(
+        self,
+        prompts: List[str],
+        model_id: Optional[str] = None,
+        max_length: Optional[int] = None,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        timeout: float = 300.0,
+        repetition_penalty: float = 1.15,
+        top_k: int = 80,
+        max_time: Optional[float] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Generate text for multiple prompts, yielding each response as it is parsed.
+
+        The batch is sent as a single request. With ijson installed the
+        response body is parsed incrementally, so the first results are
+        available before the whole body has arrived and the raw body is never
+        held in memory alongside the parsed list. Without ijson, or for a
+        server without /generate/batch, this falls back to batch_generate().
+
+        Args:
+            prompts: List of prompts to generate text from
+            model_id: Optional model ID to use
+            max_length: Maximum length of the generated text
+            temperature: Temperature for sampling
+            top_p: Top-p for nucleus sampling
+            timeout: Request timeout in seconds
+            repetition_penalty: Penalty for repetition (higher values = less repetition)
+            top_k: Top-k for sampling (higher values = more diverse vocabulary)
+            max_time: Optional maximum time in seconds to spend generating
+
+        Returns:
+            A generator that yields one response per prompt, in prompt order.
+        """
+        if IJSON_AVAILABLE and self._batch_supported:
+            payload = _drop_none({
+                "prompts": prompts,
+                "model_id": model_id,
+                "max_length": max_length,
+                "temperature": temperature,
+                "top_p": top_p,
+                "repetition_penalty": repetition_penalty,
+                "top_k": top_k,
+                "max_time": max_time
+            })
+
+            request_timeout = self._timeout(timeout)
+
+            try:
+                if not self._session_live():
+                    await self._open_session()
+                async with self._post_json(self._url_batch, _json_dumps(payload), request_timeout) as response:
+                    await self._raise_for_status(response, self._url_batch)
+
+                    parsed = ijson.sendable_list()
+                    parser = ijson.items_coro(parsed, "responses.item")
+                    async for chunk in response.content.iter_chunked(1 << 15):
+                        parser.send(chunk)
+                        for text in parsed:
+                            yield text
+                        del parsed[:]
+                    parser.close()
+                    for text in parsed:
+                        yield text
+                return
+            except asyncio.TimeoutError:
+                raise Exception("Request timed out. The server took too long to respond.")
+            except aiohttp.ClientError as e:
+                raise Exception(f"Connection error: {str(e)}")
+            except LocalLabHTTPError as e:
+                # Raised before anything was yielded, so falling back repeats nothing
+                if e.status not in (404, 405):
+                    raise
+                # Older servers have no /generate/batch; remember that and fan out instead
+                self._batch_supported = False
+            except LocalLabError:
+                raise
+            except ijson.JSONError as e:
+                raise Exception(f"Failed to parse response: {str(e)}")
+
+        result = await self.batch_generate(
+            prompts,
+            model_id=model_id,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            timeout=timeout,
+            repetition_penalty=repetition_penalty,
+            top_k=top_k,
+            max_time=max_time,
+            chunk_size=max(len(prompts), 1)
+        )
+        for text in result["responses"]:
+            yield text
+
+    async def _post_batch(
+        self,
+        prompts: List[str],
+        payload: Dict[str, Any],
+        timeout: float
+    ) -> Dict[str, List[str]]:
+        """Send a single /generate/batch request"""
+        return await self._request(
+            "POST", self._url_batch, "Batch generation failed",
+            payload={"prompts": prompts, **payload}, timeout=timeout
+        )
 
+    async def batch_generate_parallel(
+        self,
+        prompts: List[str],
+        max_concurrency: int = 16,
+        **kwargs: Any
+    ) -> List[Union[str, Exception]]:
+        """
+        Generate text for multiple prompts as concurrent /generate requests.
+
+        Fallback for servers without /generate/batch. Each prompt is sent as
+        its own request, with at most ``max_concurrency`` in flight, so a
+        server that schedules with continuous batching can fill its slots.
+        Concurrency above the config's ``max_connections_per_host`` waits for
+        a pooled connection, so raise both together.
+
+        Args:
+            prompts: List of prompts to generate text from
+            max_concurrency: Maximum number of requests in flight at once
+            **kwargs: Generation parameters passed to generate()
+
+        Returns:
+            One entry per prompt, in order. A prompt that failed gets its
+            exception instead of a string, so one failure does not discard
+            the other results.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        kwargs.pop("stream", None)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate_one(prompt: str) -> Union[str, Exception]:
+            async with semaphore:
                 try:
-                    return await response.json()
+                    return await self.generate(prompt, **kwargs)
+                except asyncio.CancelledError:
+                    raise
                 except Exception as e:
-                    # Handle JSON parsing errors
-                    raise Exception(f"Failed to parse response: {str(e)}")
-        except asyncio.TimeoutError:
-            raise Exception("Request timed out. The server took too long to respond.")
-        except aiohttp.ClientError as e:
-            raise Exception(f"Connection error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Batch generation failed: {str(e)}")
+                    return e
+
+        return list(await asyncio.gather(*(generate_one(prompt) for prompt in prompts)))
 
     async def load_model(self, model_id: str, timeout: float = 60.0) -> bool:
         """Load a specific model with improved error handling"""
-        # Update activity timestamp
-        self._update_activity()
+        loaded = await self._request(
+            "POST", self._url_models_load, "Model loading failed",
+            payload={"model_id": model_id}, timeout=timeout,
+            parse=lambda raw: _json_loads(raw)["status"] == "success"
+        )
+        # The current model changed, drop cached model responses
+        self._cache.clear()
+        return loaded
+
+    async def prepare(
+        self,
+        model_id: str,
+        prompt: str,
+        load_timeout: float = 300.0,
+        **kwargs: Any
+    ) -> AsyncGenerator[str, None]:
+        """
+        Load a model and stream a first generation from it.
 
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
+        The load request is overlapped with opening a second pooled
+        connection, so the generate request goes out on a warm connection as
+        soon as the model is ready. Generation is not started alongside the
+        load: the server does not queue /generate behind a pending load, so
+        the prompt could otherwise run on the previously loaded model.
 
-        try:
-            await self.connect()
-            async with self._session.post(
-                f"{self.config.base_url}/models/load",
-                json={"model_id": model_id},
-                timeout=request_timeout
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Model loading failed: {error_text}")
+        Args:
+            model_id: ID of the model to load
+            prompt: The prompt to generate text from
+            load_timeout: Seconds to wait for the load request, and again for a
+                load the server finishes in the background
+            **kwargs: Generation parameters passed to stream_generate()
 
-                try:
-                    data = await response.json()
-                    return data["status"] == "success"
-                except Exception as e:
-                    # Handle JSON parsing errors
-                    raise Exception(f"Failed to parse response: {str(e)}")
-        except asyncio.TimeoutError:
-            raise Exception("Request timed out. The server took too long to respond.")
-        except aiohttp.ClientError as e:
-            raise Exception(f"Connection error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Model loading failed: {str(e)}")
+        Returns:
+            A generator that yields chunks of generated text.
+        """
+        if not self._session_live():
+            await self._open_session()
+        # /models/load answers once the model is loaded, so it needs the load timeout too
+        loaded, _ = await asyncio.gather(
+            self.load_model(model_id, timeout=load_timeout),
+            # Probe on the main pool (not health_check()'s) to warm a connection for the stream
+            self._probe_health(self._session, self._timeout(10.0))
+        )
+        if not loaded:
+            # The server accepted the load but is still running it in the background
+            await self._wait_for_model(model_id, load_timeout)
+
+        async for token in self.stream_generate(prompt, model_id=model_id, **kwargs):
+            yield token
+
+    async def _wait_for_model(self, model_id: str, timeout: float, interval: float = 0.5):
+        """Poll /models/current until it reports model_id, backing off between polls"""
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            # Bypass the response cache, the answer is expected to change
+            self._cache.pop(self._url_models_current, None)
+            try:
+                current = await self.get_current_model()
+                if current.get("id") == model_id:
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 404 until a model has finished loading
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LocalLabError(f"Model {model_id} did not finish loading within {timeout}s")
+            await asyncio.sleep(min(remaining, _backoff_delay(attempt, interval, 5.0)))
+            attempt += 1
+
+    def _cached_response(self, url: str) -> Any:
+        """
+        Return the cached response for url if it is still fresh, else None.
 
-    async def get_current_model(self, timeout: float = 30.0) -> Dict[str, Any]:
-        """Get information about the currently loaded model with improved error handling"""
-        # Update activity timestamp
-        self._update_activity()
+        This only reads the cache, so SyncLocalLabClient calls it from its own
+        thread to answer without a round trip to the event loop.
+        """
+        cached = self._cache.get(url)
+        if cached is not None and time.monotonic() < cached[0]:
+            return cached[1]
+        return None
 
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
+    async def _get_json_cached(self, url: str, request_timeout) -> Any:
+        """
+        GET a JSON endpoint through the short-lived response cache.
 
-        try:
-            await self.connect()
-            async with self._session.get(
-                f"{self.config.base_url}/models/current",
-                timeout=request_timeout
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Failed to get current model: {error_text}")
+        Fresh entries are returned without a request. Stale entries are
+        revalidated with If-None-Match, so an unchanged resource costs a 304
+        with no body to transfer or decode.
+        """
+        now = time.monotonic()
+        cached = self._cache.get(url)
+        if cached is not None and now < cached[0]:
+            return cached[1]
+
+        headers = {"If-None-Match": cached[2]} if cached is not None and cached[2] else None
+        if not self._session_live():
+            await self._open_session()
+        async with self._session.get(url, headers=headers, timeout=request_timeout) as response:
+            if response.status == 304 and cached is not None:
+                self._cache[url] = (now + self.config.ttl, cached[1], cached[2])
+                return cached[1]
+            await self._raise_for_status(response, url)
 
-                try:
-                    return await response.json()
-                except Exception as e:
-                    # Handle JSON parsing errors
-                    raise Exception(f"Failed to parse response: {str(e)}")
-        except asyncio.TimeoutError:
-            raise Exception("Request timed out. The server took too long to respond.")
-        except aiohttp.ClientError as e:
-            raise Exception(f"Connection error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Failed to get current model: {str(e)}")
+            try:
+                data = _json_loads(await response.read())
+            except Exception as e:
+                # Handle JSON parsing errors
+                raise Exception(f"Failed to parse response: {str(e)}")
+            etag = response.headers.get("ETag")
+
+        if self.config.ttl > 0:
+            self._cache[url] = (now + self.config.ttl, data, etag)
+        return data
+
+    async def get_current_model(self, timeout: float = 30.0) -> Dict[str, Any]:
+        """Get information about the currently loaded model with improved error handling"""
+        return await self._request(
+            "GET", self._url_models_current, "Failed to get current model",
+            timeout=timeout, cached=True
+        )
 
     async def list_models(self, timeout: float = 30.0) -> Dict[str, Any]:
         """List all available models with improved error handling"""
-        # Update activity timestamp
-        self._update_activity()
+        data = await self._request(
+            "GET", self._url_models_available, "Failed to list models",
+            timeout=timeout, cached=True
+        )
+        return data["models"]
 
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
+    async def health_check(self, timeout: float = 1.0) -> bool:
+        """
+        Check if the server is healthy with a short timeout.
 
+        Probes go through a small dedicated connection pool, so they answer
+        quickly even while every pooled connection is busy streaming.
+        """
+        if self._closed:
+            raise RuntimeError("Client is closed")
+        if self._probe_session is None or self._probe_session.closed:
+            self._probe_session = self._create_probe_session()
+            if self._probe_finalizer is not None:
+                self._probe_finalizer.detach()
+            self._probe_finalizer = weakref.finalize(
+                self, _finalize_session, self._probe_session, asyncio.get_running_loop()
+            )
+            self._probe_finalizer.atexit = False
+        return await self._probe_health(self._probe_session, self._probe_timeout(timeout))
+
+    def _create_probe_session(self):
+        """Build the two-connection session used by health_check() for the configured transport"""
+        if self.config.transport == "httpx":
+            from .transport import HTTPXSession
+
+            return HTTPXSession(
+                headers=self._session_headers(),
+                timeout=None,
+                max_connections_per_host=2,
+            )
+        return aiohttp.ClientSession(
+            headers=self._session_headers(),
+            connector=aiohttp.TCPConnector(limit=2, keepalive_timeout=120),
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _probe_timeout(total: float) -> "aiohttp.ClientTimeout":
+        """Timeout for health probes: fail fast when the server can't even be reached"""
+        return aiohttp.ClientTimeout(total=total, sock_connect=min(total, 0.5))
+
+    async def _probe_health(self, session, request_timeout) -> bool:
+        """HEAD /health on the given session; any error means the server is not healthy"""
         try:
-            await self.connect()
-            async with self._session.get(
-                f"{self.config.base_url}/models/available",
+            # HEAD avoids transferring the body; fall back to GET for servers
+            # that only route GET on /health
+            async with session.head(
+                self._url_health,
                 timeout=request_timeout
             ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Failed to list models: {error_text}")
-
-                try:
-                    data = await response.json()
-                    return data["models"]
-                except Exception as e:
-                    # Handle JSON parsing errors
-                    raise Exception(f"Failed to parse response: {str(e)}")
-        except asyncio.TimeoutError:
-            raise Exception("Request timed out. The server took too long to respond.")
-        except aiohttp.ClientError as e:
-            raise Exception(f"Connection error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Failed to list models: {str(e)}")
-
-    async def health_check(self, timeout: float = 10.0) -> bool:
-        """Check if the server is healthy with a short timeout"""
-        # Update activity timestamp
-        self._update_activity()
-
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
-
-        try:
-            await self.connect()
-            async with self._session.get(
-                f"{self.config.base_url}/health",
+                if response.status != 405:
+                    return response.status in (200, 204)
+            async with session.get(
+                self._url_health,
                 timeout=request_timeout
             ) as response:
                 return response.status == 200
+        except asyncio.CancelledError:
+            raise
         except (asyncio.TimeoutError, aiohttp.ClientError, Exception):
             # Any error means the server is not healthy
             return False
 
     async def get_system_info(self, timeout: float = 30.0) -> Dict[str, Any]:
         """Get detailed system information with improved error handling"""
-        # Update activity timestamp
-        self._update_activity()
-
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
-
-        try:
-            await self.connect()
-            async with self._session.get(
-                f"{self.config.base_url}/system/info",
-                timeout=request_timeout
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Failed to get system info: {error_text}")
-
-                try:
-                    return await response.json()
-                except Exception as e:
-                    # Handle JSON parsing errors
-                    raise Exception(f"Failed to parse response: {str(e)}")
-        except asyncio.TimeoutError:
-            raise Exception("Request timed out. The server took too long to respond.")
-        except aiohttp.ClientError as e:
-            raise Exception(f"Connection error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Failed to get system info: {str(e)}")
+        return await self._request(
+            "GET", self._url_sysinfo, "Failed to get system info", timeout=timeout
+        )
 
     async def unload_model(self, timeout: float = 30.0) -> bool:
         """Unload the current model to free up resources with improved error handling"""
-        # Update activity timestamp
-        self._update_activity()
-
-        # Create a timeout for this specific request
-        request_timeout = aiohttp.ClientTimeout(total=timeout)
-
-        try:
-            await self.connect()
-            async with self._session.post(
-                f"{self.config.base_url}/models/unload",
-                timeout=request_timeout
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"Failed to unload model: {error_text}")
-
-                try:
-                    data = await response.json()
-                    return data["status"] == "Model unloaded successfully"
-                except Exception as e:
-                    # Handle JSON parsing errors
-                    raise Exception(f"Failed to parse response: {str(e)}")
-        except asyncio.TimeoutError:
-            raise Exception("Request timed out. The server took too long to respond.")
-        except aiohttp.ClientError as e:
-            raise Exception(f"Connection error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Failed to unload model: {str(e)}")
\ No newline at end of file
+        unloaded = await self._request(
+            "POST", self._url_models_unload, "Failed to unload model", timeout=timeout,
+            parse=lambda raw: _json_loads(raw)["status"] == "Model unloaded successfully"
+        )
+        # The current model changed, drop cached model responses
+        self._cache.clear()
+        return unloaded
\ No newline at end of file
@@ -4,12 +4,13 @@ This module provides a synchronous wrapper around the async LocalLabClient.
 """
 
 import asyncio
+import queue
 import threading
+import weakref
 import sys
 import os
 import time
-from typing import List, Dict, Any, Optional, Generator, Union
-from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Generator, Tuple, Union
 import logging
 
 # Import from the package root
@@ -17,62 +18,153 @@ from .client import LocalLabClient, LocalLabConfig
 
 logger = logging.getLogger(__name__)
 
+# uvloop (winloop on Windows) is optional but faster for many small requests
+try:
+    if sys.platform == "win32":
+        import winloop as uvloop
+    else:
+        import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+def _new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create the background loop, preferring uvloop when it is installed"""
+    if UVLOOP_AVAILABLE:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+def _run_loop(loop: asyncio.AbstractEventLoop):
+    """Body of the background thread: run the loop until stopped, then close it"""
+    try:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+    except Exception as e:
+        logger.error(f"Event loop error: {str(e)}")
+    finally:
+        try:
+            # Cancel all running tasks
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            # Run loop until tasks are cancelled
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        except Exception as e:
+            logger.error(f"Error during event loop cleanup: {str(e)}")
+        finally:
+            # A closed loop is how _loop_alive() sees that this thread ended
+            loop.close()
+
+# One loop thread serves every SyncLocalLabClient, so clients for the same
+# server also share the async client's pooled session on that loop
+_background_lock = threading.Lock()
+_background: Optional[Tuple[asyncio.AbstractEventLoop, threading.Thread]] = None
+
+def _background_loop() -> Tuple[asyncio.AbstractEventLoop, threading.Thread]:
+    """Return the shared loop and its thread, starting them on first use"""
+    global _background
+    with _background_lock:
+        if _background is None or _background[0].is_closed():
+            loop = _new_event_loop()
+            thread = threading.Thread(target=_run_loop, args=(loop,), name="locallab-sync-loop", daemon=True)
+            thread.start()
+            _background = (loop, thread)
+        return _background
+
+def _close_async_client(loop: asyncio.AbstractEventLoop, thread: threading.Thread, async_client: LocalLabClient):
+    """Close the async client on the shared loop; also the finalizer for unclosed clients"""
+    if loop.is_closed():
+        return
+    if threading.current_thread() is thread:
+        # Waiting from the loop's own thread would deadlock, so leave it to the loop
+        loop.create_task(async_client.close())
+        return
+    try:
+        future = asyncio.run_coroutine_threadsafe(async_client.close(), loop)
+        future.result(timeout=5)
+    except Exception as e:
+        logger.error(f"Error closing async client: {str(e)}")
+
 class SyncLocalLabClient:
     """
     Synchronous client for the LocalLab API.
+
+    Calls run on one background event loop thread shared by all sync clients.
     """
 
-    def __init__(self, base_url: str = "http://localhost:8000", timeout: float = 30.0):
-        """Initialize the synchronous client."""
+    __slots__ = (
+        "_async_client", "_loop", "_thread", "_lock", "_is_closed", "_finalizer", "_max_queue",
+        "__weakref__",
+    )
+
+    def __init__(self, base_url: str = "http://localhost:8000", timeout: float = 30.0,
+                 max_queue: int = 64):
+        """
+        Initialize the synchronous client.
+
+        Args:
+            base_url: URL of the LocalLab server
+            timeout: Default request timeout in seconds
+            max_queue: Maximum number of streamed chunks buffered for a slow consumer
+        """
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
         self._async_client = LocalLabClient(LocalLabConfig(base_url=base_url, timeout=timeout))
+        self._max_queue = max_queue
         self._loop = None
         self._thread = None
-        self._executor = ThreadPoolExecutor(max_workers=1)
         self._lock = threading.RLock()
         self._is_closed = False
-        self._initialize_event_loop()
+        self._finalizer: Optional[weakref.finalize] = None
+        # The loop thread is started by the first call, see _ensure_connection()
 
     def _initialize_event_loop(self):
-        """Initialize a dedicated event loop in a separate thread with error handling."""
+        """Attach this client to the shared background event loop."""
         with self._lock:
-            if self._loop is None or self._thread is None:
+            # Re-check under the lock: another thread may have attached already
+            if not self._loop_alive():
                 try:
-                    self._loop = asyncio.new_event_loop()
-
-                    def run_event_loop():
-                        try:
-                            asyncio.set_event_loop(self._loop)
-                            self._loop.run_forever()
-                        except Exception as e:
-                            logger.error(f"Event loop error: {str(e)}")
-                        finally:
-                            try:
-                                # Cancel all running tasks
-                                pending = asyncio.all_tasks(self._loop)
-                                for task in pending:
-                                    task.cancel()
-                                # Run loop until tasks are cancelled
-                                self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
-                                self._loop.close()
-                            except Exception as e:
-                                logger.error(f"Error during event loop cleanup: {str(e)}")
-
-                    self._thread = threading.Thread(target=run_event_loop, daemon=True)
-                    self._thread.start()
+                    self._loop, self._thread = _background_loop()
+
+                    # The finalizer only references the async client, never self,
+                    # so an unclosed client can still be garbage collected
+                    if self._finalizer is not None:
+                        self._finalizer.detach()
+                    self._finalizer = weakref.finalize(
+                        self, _close_async_client, self._loop, self._thread, self._async_client
+                    )
                 except Exception as e:
                     logger.error(f"Failed to initialize event loop: {str(e)}")
                     raise RuntimeError(f"Failed to initialize client: {str(e)}")
 
+    def _loop_alive(self) -> bool:
+        """Whether the background loop thread is running"""
+        # is_closed() is a flag read; Thread.is_alive() would take a lock on every call
+        return self._loop is not None and not self._loop.is_closed()
+
     def _ensure_connection(self):
         """Ensure the client is connected and ready."""
         if self._is_closed:
             raise RuntimeError("Client is closed")
-        if not self._loop or not self._thread or not self._thread.is_alive():
+        # Double-checked: the lock is only taken when the loop has to be (re)started
+        if not self._loop_alive():
             self._initialize_event_loop()
 
     def _run_coroutine(self, coro, timeout: Optional[float] = None):
         """Run a coroutine in the event loop thread with timeout and error handling."""
-        self._ensure_connection()
+        try:
+            self._ensure_connection()
+        except RuntimeError:
+            # Closed client: the coroutine will never run, so don't leave it unawaited
+            coro.close()
+            raise
+        if threading.current_thread() is self._thread:
+            # Blocking the loop's own thread on its result would deadlock
+            coro.close()
+            raise RuntimeError(
+                "SyncLocalLabClient cannot be called from its own event loop; "
+                "await the LocalLabClient method instead"
+            )
 
         try:
             future = asyncio.run_coroutine_threadsafe(coro, self._loop)
@@ -83,6 +175,81 @@ class SyncLocalLabClient:
             logger.error(f"Error running coroutine: {str(e)}")
             raise
 
+    def _bridge_stream(self, agen, error_chunk, join=None) -> Generator[Any, None, None]:
+        """
+        Run an async generator on the loop thread and iterate its items from this thread.
+
+        With ``join``, items that are already queued when the consumer asks for
+        the next one are merged into a single chunk instead of yielded one by one.
+        """
+        # The producer hands items over a thread-safe queue, so the consumer
+        # blocks on queue.get() instead of scheduling a coroutine per item
+        chunks: "queue.Queue[Any]" = queue.Queue()
+        limit = self._max_queue
+        # Holds the producer's asyncio.Event while it waits for the consumer
+        paused: List[Optional[asyncio.Event]] = [None]
+
+        async def producer():
+            try:
+                async for chunk in agen:
+                    chunks.put_nowait(chunk)
+                    while chunks.qsize() >= limit:
+                        # Stop reading the response until the consumer catches up,
+                        # which lets TCP flow control slow the server down
+                        resume = paused[0] = asyncio.Event()
+                        if chunks.qsize() < limit:
+                            paused[0] = None
+                            break
+                        await resume.wait()
+            except Exception as e:
+                chunks.put_nowait(error_chunk(e))
+            finally:
+                # None signals end of stream
+                chunks.put_nowait(None)
+                # Cancelled while paused the stream is still open; close it now
+                # rather than when the generator is garbage-collected
+                await agen.aclose()
+
+        self._ensure_connection()
+        loop = self._loop
+
+        def consumer():
+            # Scheduled on the first next(), so a generator that is never
+            # iterated leaves no task (or connection) behind on the loop
+            future = asyncio.run_coroutine_threadsafe(producer(), loop)
+            try:
+                finished = False
+                while not finished:
+                    chunk = chunks.get()
+                    if chunk is not None and join is not None:
+                        # Drain the burst that arrived while the caller was busy
+                        burst = [chunk]
+                        while True:
+                            try:
+                                item = chunks.get_nowait()
+                            except queue.Empty:
+                                break
+                            if item is None:
+                                finished = True
+                                break
+                            burst.append(item)
+                        if len(burst) > 1:
+                            chunk = join(burst)
+                    # Wake a paused producer; checking after the last get() means
+                    # a pause that began before it cannot be missed
+                    resume = paused[0]
+                    if resume is not None:
+                        paused[0] = None
+                        loop.call_soon_threadsafe(resume.set)
+                    if chunk is None:
+                        break
+                    yield chunk
+            finally:
+                # Stop the producer (and free its connection) if iteration ended early
+                future.cancel()
+
+        return consumer()
+
     def __enter__(self):
         """Context manager entry with connection validation."""
         self._ensure_connection()
@@ -92,41 +259,20 @@ class SyncLocalLabClient:
         """Context manager exit with proper cleanup."""
         self.close()
 
-    def __del__(self):
-        """Cleanup on garbage collection."""
-        if not self._is_closed:
-            self.close()
-
     def close(self):
         """Close the client with proper cleanup of all resources."""
         with self._lock:
             if not self._is_closed:
                 try:
-                    # Close async client first
-                    if self._loop and self._thread and self._thread.is_alive():
-                        try:
-                            future = asyncio.run_coroutine_threadsafe(
-                                self._async_client.close(), self._loop
-                            )
-                            future.result(timeout=5)
-                        except Exception as e:
-                            logger.error(f"Error closing async client: {str(e)}")
-
-                    # Stop event loop
-                    if self._loop and not self._loop.is_closed():
-                        self._loop.call_soon_threadsafe(self._loop.stop)
-
-                    # Wait for thread to finish
-                    if self._thread and self._thread.is_alive():
-                        self._thread.join(timeout=1)
+                    # Close the async client (the shared loop keeps running); calling
+                    # the finalizer runs it now and keeps it from running again at GC
+                    if self._finalizer is not None:
+                        self._finalizer()
 
                     # Clean up
                     self._loop = None
                     self._thread = None
 
-                    # Shutdown executor
-                    self._executor.shutdown(wait=False)
-
                 except Exception as e:
                     logger.error(f"Error during client cleanup: {str(e)}")
                 finally:
@@ -208,7 +354,8 @@ class SyncLocalLabClient:
         repetition_penalty: float = 1.15,  # Increased repetition penalty for better quality
         top_k: int = 80,  # Added top_k parameter for better quality
         do_sample: bool = True,  # Added do_sample parameter
-        max_time: Optional[float] = None  # Added max_time parameter to limit generation time
+        max_time: Optional[float] = None,  # Added max_time parameter to limit generation time
+        chunk_tokens: int = 1
     ) -> Generator[str, None, None]:
         """
         Stream text generation with improved quality and reliability.
@@ -224,68 +371,31 @@ class SyncLocalLabClient:
             top_k: Top-k for sampling (higher values = more diverse vocabulary)
             do_sample: Whether to use sampling instead of greedy decoding
             max_time: Optional maximum time in seconds to spend generating (server-side timeout, defaults to 180 seconds if not provided)
+            chunk_tokens: Number of tokens to join into each yielded chunk; larger values mean fewer cross-thread handoffs
 
         Returns:
-            A generator that yields chunks of text as they are generated.
+            A generator that yields chunks of text as they are generated. Chunks
+            that arrive while the caller is busy are merged into the next one.
         """
         # Use a higher max_length by default to ensure complete responses
         if max_length is None:
             max_length = 4096  # Default to 4096 tokens for more complete responses
 
-        # Create a queue to pass data between the async and sync worlds
-        queue = asyncio.Queue()
-        stop_event = threading.Event()
-
-        # Define the async producer function
-        async def producer():
-            try:
-                async for chunk in self._async_client.stream_generate(
-                    prompt=prompt,
-                    model_id=model_id,
-                    max_length=max_length,
-                    temperature=temperature,
-                    top_p=top_p,
-                    timeout=timeout,
-                    retry_count=3,  # Increased retry count for better reliability
-                    repetition_penalty=repetition_penalty,  # Pass the repetition penalty parameter
-                    top_k=top_k,  # Pass the top_k parameter
-                    do_sample=do_sample,  # Pass the do_sample parameter
-                    max_time=max_time  # Pass the max_time parameter
-                ):
-                    await queue.put(chunk)
-
-                    # Check if consumer has stopped
-                    if stop_event.is_set():
-                        break
-
-                # Signal end of stream
-                await queue.put(None)
-            except Exception as e:
-                # Put the error in the queue
-                await queue.put(f"\nError: {str(e)}")
-                await queue.put(None)
-
-        # Start the producer in the event loop
-        asyncio.run_coroutine_threadsafe(producer(), self._loop)
-
-        # Define the consumer generator
-        def consumer():
-            try:
-                while True:
-                    # Get the next chunk from the queue
-                    chunk = self._run_coroutine(queue.get())
-
-                    # None signals end of stream
-                    if chunk is None:
-                        break
-
-                    yield chunk
-            finally:
-                # Signal producer to stop if consumer is stopped
-                stop_event.set()
-
-        # Return the consumer generator
-        return consumer()
+        agen = self._async_client.stream_generate(
+            prompt=prompt,
+            model_id=model_id,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            timeout=timeout,
+            retry_count=3,  # Increased retry count for better reliability
+            repetition_penalty=repetition_penalty,  # Pass the repetition penalty parameter
+            top_k=top_k,  # Pass the top_k parameter
+            do_sample=do_sample,  # Pass the do_sample parameter
+            max_time=max_time,  # Pass the max_time parameter
+            chunk_tokens=chunk_tokens
+        )
+        return self._bridge_stream(agen, lambda e: f"\nError: {str(e)}", join="".join)
 
     def chat(
         self,
@@ -382,59 +492,19 @@ class SyncLocalLabClient:
         if max_length is None:
             max_length = 4096  # Default to 4096 tokens for more complete responses
 
-        # Create a queue to pass data between the async and sync worlds
-        queue = asyncio.Queue()
-        stop_event = threading.Event()
-
-        # Define the async producer function
-        async def producer():
-            try:
-                async for chunk in self._async_client.stream_chat(
-                    messages=messages,
-                    model_id=model_id,
-                    max_length=max_length,
-                    temperature=temperature,
-                    top_p=top_p,
-                    timeout=timeout,
-                    retry_count=3,  # Increased retry count for better reliability
-                    repetition_penalty=repetition_penalty,
-                    top_k=top_k,
-                    max_time=max_time
-                ):
-                    await queue.put(chunk)
-
-                    # Check if consumer has stopped
-                    if stop_event.is_set():
-                        break
-
-                # Signal end of stream
-                await queue.put(None)
-            except Exception as e:
-                # Put the error in the queue
-                await queue.put({"error": str(e)})
-                await queue.put(None)
-
-        # Start the producer in the event loop
-        asyncio.run_coroutine_threadsafe(producer(), self._loop)
-
-        # Define the consumer generator
-        def consumer():
-            try:
-                while True:
-                    # Get the next chunk from the queue
-                    chunk = self._run_coroutine(queue.get())
-
-                    # None signals end of stream
-                    if chunk is None:
-                        break
-
-                    yield chunk
-            finally:
-                # Signal producer to stop if consumer is stopped
-                stop_event.set()
-
-        # Return the consumer generator
-        return consumer()
+        agen = self._async_client.stream_chat(
+            messages=messages,
+            model_id=model_id,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            timeout=timeout,
+            retry_count=3,  # Increased retry count for better reliability
+            repetition_penalty=repetition_penalty,
+            top_k=top_k,
+            max_time=max_time
+        )
+        return self._bridge_stream(agen, lambda e: {"error": str(e)})
 
     def batch_generate(
         self,
@@ -483,6 +553,34 @@ class SyncLocalLabClient:
             )
         )
 
+    def batch_generate_parallel(
+        self,
+        prompts: List[str],
+        max_concurrency: int = 16,
+        **kwargs: Any
+    ) -> List[Union[str, Exception]]:
+        """
+        Generate text for multiple prompts as concurrent /generate requests.
+
+        Fallback for servers without /generate/batch. Failed prompts get
+        their exception in place of a string.
+
+        Args:
+            prompts: List of prompts to generate text from
+            max_concurrency: Maximum number of requests in flight at once
+            **kwargs: Generation parameters passed to generate()
+
+        Returns:
+            One result per prompt, in order.
+        """
+        return self._run_coroutine(
+            self._async_client.batch_generate_parallel(
+                prompts=prompts,
+                max_concurrency=max_concurrency,
+                **kwargs
+            )
+        )
+
     def load_model(self, model_id: str) -> bool:
         """
         Load a specific model.
@@ -502,6 +600,10 @@ class SyncLocalLabClient:
         Returns:
             Dictionary with information about the current model.
         """
+        # A fresh cached answer needs no trip to the loop thread
+        cached = self._async_client._cached_response(self._async_client._url_models_current)
+        if cached is not None and not self._is_closed:
+            return cached
         return self._run_coroutine(self._async_client.get_current_model())
 
     def list_models(self) -> Dict[str, Any]:
@@ -511,6 +613,9 @@ class SyncLocalLabClient:
         Returns:
             Dictionary with information about available models.
         """
+        cached = self._async_client._cached_response(self._async_client._url_models_available)
+        if cached is not None and not self._is_closed:
+            return cached["models"]
         return self._run_coroutine(self._async_client.list_models())
 
     def health_check(self) -> bool:
@@ -0,0 +1,178 @@
+"""
+Alternative HTTP transports for the LocalLab client.
+
+The client talks to the server through an aiohttp-style session. This module
+provides an adapter that exposes the same small surface on top of
+``httpx.AsyncClient`` so HTTP/2 multiplexing can be used without changing the
+request code in ``client.py``.
+"""
+
+import asyncio
+import warnings
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401  (httpx's HTTP/2 support)
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+
+def _timeout_seconds(timeout: Any) -> Optional[float]:
+    """Convert an aiohttp ClientTimeout (or a plain number) to seconds"""
+    if timeout is None:
+        return None
+    if isinstance(timeout, aiohttp.ClientTimeout):
+        return timeout.total
+    return float(timeout)
+
+
+class HTTPXConnectError(aiohttp.ClientConnectionError):
+    """Connecting to the server failed, so no part of the request was sent"""
+
+
+def _map_httpx_error(e: Exception) -> Exception:
+    """Translate an httpx exception into the aiohttp/asyncio type the client handles"""
+    if isinstance(e, httpx.TimeoutException):
+        return asyncio.TimeoutError(str(e))
+    if isinstance(e, httpx.ConnectError):
+        return HTTPXConnectError(str(e))
+    return aiohttp.ClientConnectionError(str(e))
+
+
+class HTTPXStreamReader:
+    """Minimal aiohttp.StreamReader lookalike backed by an httpx response"""
+
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+
+    async def iter_chunked(self, n: int):
+        # Like aiohttp, yield data as soon as it arrives (at most n bytes at a
+        # time); aiter_bytes(chunk_size=n) would hold it back until n bytes
+        try:
+            async for chunk in self._response.aiter_bytes():
+                for start in range(0, len(chunk), n):
+                    yield chunk[start:start + n]
+        except httpx.TransportError as e:
+            raise _map_httpx_error(e) from e
+
+    async def read(self, n: int = -1) -> bytes:
+        try:
+            if n < 0:
+                return await self._response.aread()
+            # Stop after n bytes instead of downloading the whole body
+            body = b""
+            async for chunk in self._response.aiter_bytes():
+                body += chunk
+                if len(body) >= n:
+                    break
+            return body[:n]
+        except httpx.TransportError as e:
+            raise _map_httpx_error(e) from e
+
+
+class HTTPXResponse:
+    """Minimal aiohttp.ClientResponse lookalike backed by an httpx response"""
+
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+        self.status = response.status_code
+        self.headers = response.headers
+        self.content = HTTPXStreamReader(response)
+
+    async def read(self) -> bytes:
+        return await self.content.read()
+
+
+class _HTTPXRequestContext:
+    """Async context manager returned by HTTPXSession request methods"""
+
+    def __init__(self, client: "httpx.AsyncClient", method: str, url: str, **kwargs):
+        self._client = client
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+        self._response = None
+
+    async def __aenter__(self) -> HTTPXResponse:
+        try:
+            request = self._client.build_request(self._method, self._url, **self._kwargs)
+            self._response = await self._client.send(request, stream=True)
+        except httpx.TransportError as e:
+            raise _map_httpx_error(e) from e
+        return HTTPXResponse(self._response)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._response is not None:
+            await self._response.aclose()
+
+
+class HTTPXSession:
+    """
+    Session adapter that drives an ``httpx.AsyncClient`` with HTTP/2 enabled.
+
+    Concurrent requests share a single TCP/TLS connection when the server
+    negotiates HTTP/2, instead of each taking a pooled HTTP/1.1 connection.
+    """
+
+    def __init__(self, headers: Dict[str, str], timeout: Optional[float],
+                 max_connections_per_host: int = 32):
+        if not HTTPX_AVAILABLE:
+            raise ImportError(
+                "The httpx transport requires httpx with HTTP/2 support. "
+                "Install with: pip install 'locallab-client[http2]'"
+            )
+        if not H2_AVAILABLE:
+            # httpx refuses http2=True without h2; still usable over HTTP/1.1
+            warnings.warn(
+                "The 'h2' package is not installed, the httpx transport will use HTTP/1.1. "
+                "Install with: pip install 'locallab-client[http2]'"
+            )
+        self._client = httpx.AsyncClient(
+            http2=H2_AVAILABLE,
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_keepalive_connections=max_connections_per_host,
+                max_connections=max(100, max_connections_per_host),
+                keepalive_expiry=120,
+            ),
+        )
+
+    @property
+    def closed(self) -> bool:
+        return self._client.is_closed
+
+    def _request(self, method: str, url: str, json: Any = None, data: Any = None,
+                 headers: Optional[Dict[str, str]] = None, timeout: Any = None) -> _HTTPXRequestContext:
+        kwargs: Dict[str, Any] = {}
+        if json is not None:
+            kwargs["json"] = json
+        if data is not None:
+            kwargs["content"] = data
+        if headers:
+            kwargs["headers"] = headers
+        if timeout is not None:
+            kwargs["timeout"] = _timeout_seconds(timeout)
+        return _HTTPXRequestContext(self._client, method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> _HTTPXRequestContext:
+        return self._request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> _HTTPXRequestContext:
+        return self._request("POST", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> _HTTPXRequestContext:
+        return self._request("HEAD", url, **kwargs)
+
+    async def close(self):
+        await self._client.aclose()
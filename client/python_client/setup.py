@@ -17,6 +17,16 @@ setup(
         "asyncio>=3.4.3",
         "nest-asyncio>=1.5.1",
     ],
+    extras_require={
+        "http2": ["httpx[http2]>=0.24.0"],
+        "fast": [
+            "orjson>=3.9.0",
+            "msgspec>=0.18.0; python_version >= '3.8'",
+            "ijson>=3.2.0",
+            "uvloop>=0.17.0; sys_platform != 'win32'",
+            "winloop>=0.1.0; sys_platform == 'win32'",
+        ],
+    },
     python_requires=">=3.7",
     classifiers=[
         "Development Status :: 5 - Production/Stable",
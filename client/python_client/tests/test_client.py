@@ -1,7 +1,12 @@
+import asyncio
+import gc
+import threading
+import time
 import pytest
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 from aiohttp import ClientSession, ClientResponse, WSMessage
+from locallab_client.client import _backoff_delay, _gather_cancelling, _iter_lines, _iter_sse
 from locallab_client import (
     LocalLabClient,
     LocalLabConfig,
@@ -14,8 +19,22 @@ from locallab_client import (
     SystemInfo,
     ValidationError,
     RateLimitError,
+    BatchingGenerator,
+    SyncLocalLabClient,
+    LocalLabError,
+    LocalLabHTTPError,
 )
 
+def _fake_stream_response(chunks):
+    """A response whose content.iter_chunked() yields the given byte chunks"""
+    async def iter_chunked(n):
+        for chunk in chunks:
+            yield chunk
+
+    response = MagicMock()
+    response.content.iter_chunked = iter_chunked
+    return response
+
 @pytest.fixture
 def client():
     return LocalLabClient({
@@ -68,6 +87,16 @@ async def test_generate_with_options(client, mock_response):
         assert isinstance(response, GenerateResponse)
         assert response.response == "Generated text"
 
+@pytest.mark.asyncio
+async def test_unencodable_option_gives_wrapped_error():
+    client = LocalLabClient("http://localhost:8000")
+
+    with pytest.raises(Exception, match="^Generation failed: "):
+        await client.generate("Hello", model_id=object())
+
+    chunks = [chunk async for chunk in client.stream_generate("Hello", model_id=object())]
+    assert len(chunks) == 1 and chunks[0].startswith("\nError: ")
+
 @pytest.mark.asyncio
 async def test_stream_generate(client):
     mock_response = AsyncMock()
@@ -127,6 +156,119 @@ async def test_batch_generate(client, mock_response):
         assert len(response.responses) == 3
         assert response.responses[0] == "Answer 1"
 
+@pytest.mark.asyncio
+async def test_batch_generate_falls_back_without_batch_endpoint():
+    client = LocalLabClient("http://localhost:8000")
+    response = MagicMock(status=404)
+    response.content.read = AsyncMock(return_value=b"Not Found")
+    client._session = MagicMock(closed=False)
+    client._session.post.return_value.__aenter__.return_value = response
+
+    async def generate(self, prompt, **kwargs):
+        return prompt.upper()
+
+    with patch.object(LocalLabClient, "generate", generate):
+        assert await client.batch_generate(["a", "b"]) == {"responses": ["A", "B"]}
+        assert await client.batch_generate(["c"]) == {"responses": ["C"]}
+    # The missing endpoint is remembered, so only the first call tried it
+    assert client._session.post.call_count == 1
+    client._session = None
+
+
+@pytest.mark.asyncio
+async def test_batch_generate_splits_into_concurrent_chunks():
+    client = LocalLabClient("http://localhost:8000")
+    in_flight = []
+    peak = []
+
+    async def post_batch(self, prompts, payload, timeout):
+        in_flight.append(prompts)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(prompts)
+        return {"responses": [p.upper() for p in prompts]}
+
+    with patch.object(LocalLabClient, "_post_batch", post_batch):
+        result = await client.batch_generate(list("abcde"), chunk_size=2, max_in_flight=2)
+
+    assert result == {"responses": list("ABCDE")}
+    assert len(peak) == 3 and max(peak) == 2
+
+
+@pytest.mark.asyncio
+async def test_iter_batch_generate_parses_incrementally():
+    pytest.importorskip("ijson")
+    client = LocalLabClient("http://localhost:8000")
+    response = _fake_stream_response([b'{"responses": ["A", "B', b'", "C"]}'])
+    response.status = 200
+    client._session = MagicMock(closed=False)
+    client._session.post.return_value.__aenter__.return_value = response
+
+    assert [text async for text in client.iter_batch_generate(["a", "b", "c"])] == ["A", "B", "C"]
+    client._session = None
+
+
+@pytest.mark.asyncio
+async def test_iter_batch_generate_without_ijson_uses_batch_generate():
+    client = LocalLabClient("http://localhost:8000")
+    batch_generate = AsyncMock(return_value={"responses": ["A", "B"]})
+
+    with patch("locallab_client.client.IJSON_AVAILABLE", False), \
+            patch.object(LocalLabClient, "batch_generate", batch_generate):
+        assert [text async for text in client.iter_batch_generate(["a", "b"])] == ["A", "B"]
+    assert batch_generate.await_args.kwargs["chunk_size"] == 2
+
+
+@pytest.mark.asyncio
+async def test_iter_batch_generate_falls_back_without_batch_endpoint():
+    pytest.importorskip("ijson")
+    client = LocalLabClient("http://localhost:8000")
+    response = MagicMock(status=404)
+    response.content.read = AsyncMock(return_value=b"Not Found")
+    client._session = MagicMock(closed=False)
+    client._session.post.return_value.__aenter__.return_value = response
+
+    async def generate(self, prompt, **kwargs):
+        return prompt.upper()
+
+    with patch.object(LocalLabClient, "generate", generate):
+        assert [text async for text in client.iter_batch_generate(["a", "b"])] == ["A", "B"]
+    assert client._session.post.call_count == 1 and not client._batch_supported
+    client._session = None
+
+
+def _error_response(status, body):
+    """A response with the given status whose content.read(n) honours n"""
+    response = MagicMock(status=status)
+    response.content.read = AsyncMock(side_effect=lambda n=-1: body if n < 0 else body[:n])
+    return response
+
+
+@pytest.mark.asyncio
+async def test_request_raises_http_error_with_truncated_body():
+    client = LocalLabClient("http://localhost:8000")
+    client._session = MagicMock(closed=False)
+    client._session.post.return_value.__aenter__.return_value = _error_response(500, b"x" * 10000)
+
+    with pytest.raises(LocalLabHTTPError) as exc_info:
+        await client.generate("Hello")
+    assert exc_info.value.status == 500
+    assert exc_info.value.url == "http://localhost:8000/generate"
+    assert exc_info.value.body == "x" * 4096
+    client._session = None
+
+
+@pytest.mark.asyncio
+async def test_stream_generate_reports_http_error():
+    client = LocalLabClient("http://localhost:8000")
+    client._session = MagicMock(closed=False)
+    client._session.post.return_value.__aenter__.return_value = _error_response(500, b"model crashed")
+
+    chunks = [chunk async for chunk in client.stream_generate("Hello")]
+    assert chunks == ["\nError: HTTP 500 from http://localhost:8000/generate: model crashed"]
+    client._session = None
+
+
 @pytest.mark.asyncio
 async def test_load_model(client, mock_response):
     mock_response.json.return_value = {"status": "success"}
@@ -220,4 +362,476 @@ async def test_websocket(client):
         callback = AsyncMock()
         await client.connect_ws()
         await client.on_message(callback)
-        callback.assert_called_once_with({"event": "update"}) 
\ No newline at end of file
+        callback.assert_called_once_with({"event": "update"}) 
+
+@pytest.mark.asyncio
+async def test_ws_stream_generate_reuses_socket():
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    connections = []
+
+    async def ws_generate(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connections.append(ws)
+        async for message in ws:
+            if json.loads(message.data)["prompt"] == "fail":
+                await ws.send_str("a")
+                await ws.send_str("[ERROR] boom")
+                continue
+            for token in ["Hel", "lo"]:
+                await ws.send_str(token)
+            await ws.send_str("[DONE]")
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws/generate", ws_generate)
+    server = TestServer(app)
+    await server.start_server()
+    client = LocalLabClient(f"http://{server.host}:{server.port}")
+    try:
+        assert [token async for token in client.ws_stream_generate("Hi")] == ["Hel", "lo"]
+        # An error frame ends the call but the socket stays usable
+        assert [token async for token in client.ws_stream_generate("fail")] == ["a", "\nError: boom"]
+        assert [token async for token in client.ws_stream_generate("Hi")] == ["Hel", "lo"]
+        assert len(connections) == 1
+
+        # A stream abandoned early closes its socket; the next call opens a new one
+        stream = client.ws_stream_generate("Hi")
+        assert await stream.__anext__() == "Hel"
+        await stream.aclose()
+        assert client.ws is None
+        assert [token async for token in client.ws_stream_generate("Hi")] == ["Hel", "lo"]
+        assert len(connections) == 2
+    finally:
+        await client.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_ws_stream_generate_requires_aiohttp_transport():
+    client = LocalLabClient({"base_url": "http://localhost:8000", "transport": "httpx"})
+
+    with pytest.raises(LocalLabError, match="aiohttp transport"):
+        async for _ in client.ws_stream_generate("Hi"):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_batching_generator_coalesces_calls():
+    fake_client = MagicMock()
+    fake_client.batch_generate = AsyncMock(
+        side_effect=lambda prompts, **kw: {"responses": [p.upper() for p in prompts]}
+    )
+    batcher = BatchingGenerator(fake_client, max_batch=8, window_ms=5)
+
+    results = await asyncio.gather(*(batcher.generate(p) for p in ["a", "b", "c"]))
+
+    assert results == ["A", "B", "C"]
+    fake_client.batch_generate.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_batching_generator_flushes_full_batch_without_waiting():
+    fake_client = MagicMock()
+    fake_client.batch_generate = AsyncMock(
+        side_effect=lambda prompts, **kw: {"responses": [p.upper() for p in prompts]}
+    )
+    batcher = BatchingGenerator(fake_client, max_batch=2, window_ms=10_000)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.generate("a"), batcher.generate("b")), 1
+    )
+
+    assert results == ["A", "B"]
+    fake_client.batch_generate.assert_awaited_once_with(prompts=["a", "b"], chunk_size=2)
+
+
+@pytest.mark.asyncio
+async def test_batching_generator_sends_full_batch_as_one_request():
+    client = LocalLabClient("http://localhost:8000")
+    batcher = BatchingGenerator(client, max_batch=32, window_ms=10_000)
+
+    async def post_batch(self, prompts, payload, timeout):
+        return {"responses": [p.upper() for p in prompts]}
+
+    prompts = [f"p{i}" for i in range(32)]
+    with patch.object(LocalLabClient, "_post_batch", autospec=True, side_effect=post_batch) as post:
+        results = await asyncio.gather(*(batcher.generate(p) for p in prompts))
+
+    assert results == [p.upper() for p in prompts]
+    assert post.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_batching_generator_groups_by_parameters():
+    fake_client = MagicMock()
+    fake_client.batch_generate = AsyncMock(
+        side_effect=lambda prompts, **kw: {"responses": [f"{p}@{kw['temperature']}" for p in prompts]}
+    )
+    batcher = BatchingGenerator(fake_client, max_batch=8, window_ms=5)
+
+    results = await asyncio.gather(
+        batcher.generate("a", temperature=0.1),
+        batcher.generate("b", temperature=0.9),
+        batcher.generate("c", temperature=0.1),
+    )
+
+    assert results == ["a@0.1", "b@0.9", "c@0.1"]
+    assert fake_client.batch_generate.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_batching_generator_fails_every_waiter_on_length_mismatch():
+    fake_client = MagicMock()
+    fake_client.batch_generate = AsyncMock(return_value={"responses": ["only one"]})
+    batcher = BatchingGenerator(fake_client, max_batch=8, window_ms=5)
+
+    results = await asyncio.gather(
+        batcher.generate("a"), batcher.generate("b"), return_exceptions=True
+    )
+
+    assert all("1 responses for 2 prompts" in str(r) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_batching_generator_cancelled_flush_cancels_waiters():
+    started = asyncio.Event()
+
+    async def hang(prompts, **kw):
+        started.set()
+        await asyncio.sleep(10)
+
+    fake_client = MagicMock()
+    fake_client.batch_generate = hang
+    batcher = BatchingGenerator(fake_client, max_batch=8, window_ms=1)
+
+    waiter = asyncio.ensure_future(batcher.generate("a"))
+    await started.wait()
+    for task in list(batcher._running):
+        task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(waiter, 1)
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_splits_across_chunks():
+    response = _fake_stream_response([b"data: He", b"llo\n\ndata: [DO", b"NE]\r\n", b"tail"])
+
+    lines = [line async for line in _iter_lines(response)]
+    assert lines == [b"data: Hello", b"", b"data: [DONE]", b"tail"]
+
+
+@pytest.mark.asyncio
+async def test_list_models_uses_fresh_cache_entry():
+    client = LocalLabClient("http://localhost:8000")
+    client._session = MagicMock()
+    client._cache[client._url_models_available] = (
+        time.monotonic() + 60, {"models": {"m": {}}}, '"v1"'
+    )
+
+    assert await client.list_models() == {"m": {}}
+    client._session.get.assert_not_called()
+    client._session = None
+
+
+@pytest.mark.asyncio
+async def test_shared_session_is_closed_by_last_client():
+    first = LocalLabClient("http://shared.test:8000")
+    second = LocalLabClient("http://shared.test:8000")
+    session = await first._open_session()
+
+    assert await second._open_session() is session
+    assert first._shared.users == 2
+
+    await first.close()
+    assert not session.closed and second._shared.users == 1
+    await second.close()
+    assert session.closed
+
+
+@pytest.mark.asyncio
+async def test_shared_session_requires_same_timeout():
+    first = LocalLabClient({"base_url": "http://shared.test:8000", "timeout": 5.0})
+    second = LocalLabClient({"base_url": "http://shared.test:8000", "timeout": 300.0})
+    try:
+        assert await first._open_session() is not await second._open_session()
+    finally:
+        await first.close()
+        await second.close()
+
+
+def test_shared_session_is_per_event_loop():
+    loops = [asyncio.new_event_loop(), asyncio.new_event_loop()]
+    clients = [LocalLabClient("http://shared.test:8000") for _ in loops]
+    try:
+        sessions = [loop.run_until_complete(c._open_session()) for loop, c in zip(loops, clients)]
+        assert sessions[0] is not sessions[1]
+    finally:
+        for loop, c in zip(loops, clients):
+            loop.run_until_complete(c.close())
+            loop.close()
+
+
+@pytest.mark.asyncio
+async def test_list_models_revalidates_stale_entry_with_etag():
+    client = LocalLabClient("http://localhost:8000")
+    url = client._url_models_available
+    client._cache[url] = (time.monotonic() - 1, {"models": {"m": {}}}, '"v1"')
+    client._session = MagicMock(closed=False)
+    client._session.get.return_value.__aenter__.return_value = MagicMock(status=304)
+
+    assert await client.list_models() == {"m": {}}
+    assert client._session.get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    # The 304 renewed the entry, so the next call is served without a request
+    assert client._cache[url][0] > time.monotonic()
+    assert await client.list_models() == {"m": {}}
+    assert client._session.get.call_count == 1
+    client._session = None
+
+
+@pytest.mark.asyncio
+async def test_with_retry_recovers_from_dropped_connection():
+    from aiohttp import ServerDisconnectedError
+
+    client = LocalLabClient("http://localhost:8000")
+    factory = AsyncMock(side_effect=[ServerDisconnectedError(), ServerDisconnectedError(), "ok"])
+
+    assert await client._with_retry(factory, retries=3, base=0) == "ok"
+    assert factory.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_timed_out_post_is_sent_once():
+    client = LocalLabClient("http://localhost:8000")
+    client._session = MagicMock(closed=False)
+    client._session.post.return_value.__aenter__.side_effect = asyncio.TimeoutError()
+
+    with pytest.raises(Exception, match="timed out"):
+        await client.generate("Hello")
+    assert client._session.post.call_count == 1
+    client._session = None
+
+
+@pytest.mark.asyncio
+async def test_health_check_probe_uses_configured_transport():
+    pytest.importorskip("httpx")
+    from locallab_client.transport import HTTPXSession
+
+    client = LocalLabClient({"base_url": "http://127.0.0.1:9", "transport": "httpx"})
+    assert await client.health_check(timeout=0.5) is False
+    assert isinstance(client._probe_session, HTTPXSession)
+    await client.close()
+    assert client._probe_session is None
+
+
+@pytest.mark.asyncio
+async def test_health_check_probe_closed_when_client_is_collected():
+    client = LocalLabClient("http://127.0.0.1:9")
+    assert await client.health_check(timeout=0.5) is False
+    probe = client._probe_session
+
+    with pytest.warns(UserWarning, match="garbage collected"):
+        del client
+        gc.collect()
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert probe.closed
+
+
+@pytest.mark.asyncio
+async def test_prepare_gives_load_request_the_load_timeout():
+    client = LocalLabClient("http://localhost:8000")
+    client._session = MagicMock(closed=False)
+
+    async def tokens(*args, **kwargs):
+        yield "Hi"
+
+    with patch.object(LocalLabClient, "load_model", AsyncMock(return_value=True)) as load_model, \
+            patch.object(LocalLabClient, "_probe_health", AsyncMock(return_value=True)), \
+            patch.object(LocalLabClient, "stream_generate", tokens):
+        assert [token async for token in client.prepare("m", "Hello", load_timeout=600)] == ["Hi"]
+    load_model.assert_awaited_once_with("m", timeout=600)
+    client._session = None
+
+
+@pytest.mark.asyncio
+async def test_gather_cancelling_stops_siblings_on_failure():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await _gather_cancelling([slow(), failing()])
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+
+
+def test_backoff_delay_grows_and_respects_cap():
+    for attempt in range(10):
+        delay = _backoff_delay(attempt, base=0.1, cap=2.0)
+        assert 0.05 * 2 ** attempt <= delay or delay == 2.0
+        assert delay <= 2.0
+
+
+@pytest.mark.asyncio
+async def test_iter_sse_parses_frames_and_events():
+    response = _fake_stream_response([
+        b"data: Hel", b"lo\n\nevent: error\ndata: [ERROR] bo", b"om\n\n: ping\n\ndata: [DONE]\n\n"
+    ])
+
+    events = [event async for event in _iter_sse(response)]
+    assert events == [("message", "Hello"), ("error", "[ERROR] boom"), ("message", "[DONE]")]
+
+
+@pytest.mark.asyncio
+async def test_stream_generate_groups_chunk_tokens():
+    client = LocalLabClient("http://localhost:8000")
+    client._session = MagicMock(closed=False)
+
+    # 7 tokens in groups of 3: two full groups, then the remainder at [DONE]
+    frames = b"".join(b"data: t%d\n\n" % i for i in range(7)) + b"data: [DONE]\n\n"
+    response = _fake_stream_response([frames[:20], frames[20:]])
+    response.status = 200
+    client._session.post.return_value.__aenter__.return_value = response
+    chunks = [chunk async for chunk in client.stream_generate("Hello", chunk_tokens=3)]
+    assert chunks == ["t0t1t2", "t3t4t5", "t6"]
+
+    # An error in the middle of a group flushes the group, then reports the error
+    response = _fake_stream_response([b"data: a\n\ndata: b\n\nevent: error\ndata: [ERROR] boom\n\n"])
+    response.status = 200
+    client._session.post.return_value.__aenter__.return_value = response
+    chunks = [chunk async for chunk in client.stream_generate("Hello", chunk_tokens=3)]
+    assert chunks == ["ab", "\nError: boom"]
+    client._session = None
+
+
+@pytest.mark.asyncio
+async def test_iter_sse_handles_crlf_split_across_chunks():
+    response = _fake_stream_response([b"data: a\r\n\r", b"\ndata: b\r", b"\n\r\ndata: c"])
+
+    events = [event async for event in _iter_sse(response)]
+    assert events == [("message", "a"), ("message", "b"), ("message", "c")]
+
+
+@pytest.mark.asyncio
+async def test_iter_sse_can_yield_raw_bytes():
+    response = _fake_stream_response([b"data: caf\xc3", b"\xa9\n\nevent: error\ndata: [ERROR] x\n\n"])
+
+    events = [event async for event in _iter_sse(response, decode=False)]
+    assert events == [("message", "café".encode("utf-8")), ("error", b"[ERROR] x")]
+
+
+@pytest.mark.asyncio
+async def test_httpx_iter_chunked_yields_data_as_it_arrives():
+    from locallab_client.transport import HTTPXStreamReader
+
+    async def aiter_bytes(chunk_size=None):
+        assert chunk_size is None  # a chunk_size would make httpx buffer up to it
+        for chunk in [b"data: a\n\n", b"abcdefghij"]:
+            yield chunk
+
+    response = MagicMock()
+    response.aiter_bytes = aiter_bytes
+
+    chunks = [chunk async for chunk in HTTPXStreamReader(response).iter_chunked(4)]
+    assert chunks == [b"data", b": a\n", b"\n", b"abcd", b"efgh", b"ij"]
+
+
+def test_sync_stream_pauses_producer_at_max_queue():
+    client = SyncLocalLabClient("http://localhost:8000", max_queue=2)
+    produced = []
+
+    async def tokens():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    stream = client._bridge_stream(tokens(), str)
+    time.sleep(0.05)
+    assert produced == []  # nothing runs until the first next()
+
+    assert next(stream) == 0
+    time.sleep(0.1)
+    assert len(produced) <= 3  # at most max_queue items ahead of the consumer
+    assert list(stream) == list(range(1, 10))
+    client.close()
+
+
+def test_sync_stream_early_break_closes_stream():
+    client = SyncLocalLabClient("http://localhost:8000", max_queue=2)
+    closed = threading.Event()
+
+    async def tokens():
+        try:
+            for i in range(1000):
+                yield i
+        finally:
+            closed.set()
+
+    stream = client._bridge_stream(tokens(), str)
+    for token in stream:
+        break
+    stream.close()
+
+    assert closed.wait(5)
+    client.close()
+
+
+def test_sync_stream_joins_tokens_queued_while_caller_is_busy():
+    client = SyncLocalLabClient("http://localhost:8000")
+
+    async def tokens():
+        for token in "abcde":
+            yield token
+
+    stream = client._bridge_stream(tokens(), str, join="".join)
+    chunks = [next(stream)]
+    time.sleep(0.1)
+    chunks.extend(stream)
+
+    assert "".join(chunks) == "abcde"
+    assert len(chunks) <= 2
+    client.close()
+
+
+def test_sync_clients_share_one_background_loop():
+    first = SyncLocalLabClient("http://localhost:8000")
+    second = SyncLocalLabClient("http://localhost:8001")
+    try:
+        assert first._run_coroutine(asyncio.sleep(0, result=1)) == 1
+        assert second._run_coroutine(asyncio.sleep(0, result=2)) == 2
+        assert first._loop is second._loop
+        assert first._thread is second._thread and first._thread.name == "locallab-sync-loop"
+    finally:
+        first.close()
+
+    # Closing one client closes its async client but leaves the loop to the others
+    assert first._async_client._closed
+    assert second._run_coroutine(asyncio.sleep(0, result=3)) == 3
+    second.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        second._run_coroutine(asyncio.sleep(0))
+
+
+def test_sync_client_refuses_calls_from_its_own_loop():
+    client = SyncLocalLabClient("http://localhost:8000")
+    client._ensure_connection()
+
+    async def call_from_loop():
+        return client._run_coroutine(asyncio.sleep(0))
+
+    future = asyncio.run_coroutine_threadsafe(call_from_loop(), client._loop)
+    with pytest.raises(RuntimeError, match="own event loop"):
+        future.result(timeout=5)
+    client.close()
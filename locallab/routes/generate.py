@@ -2,7 +2,7 @@
 API routes for text generation
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional, Generator, Tuple, AsyncGenerator
@@ -292,6 +292,60 @@ async def chat_completion(request: ChatRequest) -> ChatResponse:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _generate_tokens(
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    top_p: float,
+    system_prompt: Optional[str],
+    max_time: Optional[float] = None
+) -> AsyncGenerator[str, None]:
+    """
+    Yield cleaned tokens from the model with optimized parameters for
+    high-quality responses. Error messages from the model are raised.
+    """
+    # Get model-specific generation parameters
+    model_params = get_model_generation_params(model_manager.current_model)
+
+    # Update with request parameters and optimized defaults for high-quality streaming
+    generation_params = {
+        "max_new_tokens": max_tokens,
+        "temperature": temperature,
+        "top_p": top_p,
+        "top_k": 80,  # Optimized top_k for high-quality streaming
+        "repetition_penalty": 1.15,  # Optimized repetition_penalty for high-quality streaming
+        "do_sample": model_params.get("do_sample", True),  # Pass do_sample from model params
+        "max_time": max_time  # Pass max_time parameter
+    }
+
+    # Merge model-specific params with request params
+    # This ensures we get the best of both worlds - model-specific optimizations
+    # and our high-quality streaming parameters
+    generation_params.update(model_params)
+
+    # Get the stream generator with optimized parameters
+    stream_generator = model_manager.generate_stream(
+        prompt=prompt,
+        system_prompt=system_prompt,
+        **generation_params
+    )
+
+    special_token_pattern = r'<\|[a-zA-Z0-9_]+\|>'
+    async for token in stream_generator:
+        # Check for error messages
+        if token.startswith("\nError:"):
+            raise RuntimeError(token)
+
+        # Remove any special tokens that might have slipped through
+        cleaned_token = re.sub(special_token_pattern, '', token)
+
+        # Skip if token is empty after cleaning
+        if not cleaned_token or cleaned_token.isspace():
+            continue
+
+        yield cleaned_token
+
+
 async def generate_stream(
     prompt: str,
     max_tokens: int,
@@ -305,63 +359,65 @@ async def generate_stream(
     with optimized parameters for high-quality responses
     """
     try:
-        # Get model-specific generation parameters
-        model_params = get_model_generation_params(model_manager.current_model)
-
-        # Update with request parameters and optimized defaults for high-quality streaming
-        generation_params = {
-            "max_new_tokens": max_tokens,
-            "temperature": temperature,
-            "top_p": top_p,
-            "top_k": 80,  # Optimized top_k for high-quality streaming
-            "repetition_penalty": 1.15,  # Optimized repetition_penalty for high-quality streaming
-            "do_sample": model_params.get("do_sample", True),  # Pass do_sample from model params
-            "max_time": max_time  # Pass max_time parameter
-        }
-
-        # Merge model-specific params with request params
-        # This ensures we get the best of both worlds - model-specific optimizations
-        # and our high-quality streaming parameters
-        generation_params.update(model_params)
-
-        # Get the stream generator with optimized parameters
-        stream_generator = model_manager.generate_stream(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            **generation_params
-        )
-
-        # Stream tokens with proper SSE formatting and special token handling
-        async for token in stream_generator:
-            # Check for error messages
-            if token.startswith("\nError:"):
-                # Format error as SSE event
-                error_msg = token.replace("\n", "\\n")
-                yield f"data: [ERROR] {error_msg}\n\n"
-                break
-
-            # Clean any special tokens that might have slipped through
-            cleaned_token = token
-
-            # Remove any special tokens using regex pattern
-            special_token_pattern = r'<\|[a-zA-Z0-9_]+\|>'
-            import re
-            cleaned_token = re.sub(special_token_pattern, '', cleaned_token)
-
-            # Skip if token is empty after cleaning
-            if not cleaned_token or cleaned_token.isspace():
-                continue
-
+        async for token in _generate_tokens(prompt, max_tokens, temperature, top_p, system_prompt, max_time):
             # Format as server-sent event
             # Replace newlines with escaped newlines for proper SSE format
-            data = cleaned_token.replace("\n", "\\n")
+            data = token.replace("\n", "\\n")
             yield f"data: {data}\n\n"
 
         # End of stream
         yield "data: [DONE]\n\n"
     except Exception as e:
+        # Send errors as a named SSE event; the [ERROR] prefix is kept
+        # for clients that only read the data field
         logger.error(f"Streaming generation failed: {str(e)}")
-        yield f"data: [ERROR] {str(e)}\n\n"
+        error_msg = str(e).replace("\n", "\\n")
+        yield f"event: error\ndata: [ERROR] {error_msg}\n\n"
+
+
+@router.websocket("/ws/generate")
+async def generate_ws(websocket: WebSocket):
+    """
+    Stream generations for many prompts over one WebSocket connection.
+
+    Each message from the client is a generation request (the same JSON body
+    as POST /generate). The reply is one text message per token, then
+    "[DONE]", or "[ERROR] <message>" if generation failed. Frames are
+    length-delimited, so tokens are sent without SSE escaping.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                raw = message.get("bytes") or message.get("text") or ""
+                request = GenerationRequest(**json.loads(raw))
+            except Exception as e:
+                await websocket.send_text(f"[ERROR] Invalid request: {str(e)}")
+                continue
+
+            if not model_manager.current_model or not model_manager.model:
+                await websocket.send_text(
+                    "[ERROR] No model is currently loaded. Please load a model first using POST /models/load."
+                )
+                continue
+
+            try:
+                async for token in _generate_tokens(
+                    request.prompt, request.max_tokens, request.temperature,
+                    request.top_p, request.system_prompt, request.max_time
+                ):
+                    await websocket.send_text(token)
+                await websocket.send_text("[DONE]")
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket generation failed: {str(e)}")
+                await websocket.send_text(f"[ERROR] {str(e)}")
+    except WebSocketDisconnect:
+        pass
 
 
 async def stream_chat(
@@ -128,7 +128,7 @@ async def get_system_info():
         raise HTTPException(status_code=500, detail=f"Error getting system info: {str(e)}")
 
 
-@router.get("/health")
+@router.api_route("/health", methods=["GET", "HEAD"])
 async def health_check() -> Dict[str, str]:
     """Health check endpoint"""
     return {"status": "healthy"}
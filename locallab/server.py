@@ -967,6 +967,7 @@ def start_server(use_ngrok: bool = None, port: int = None, ngrok_auth_token: Opt
                     log_level="info",
                     log_config=None,  # Disable uvicorn's default logging config
                     access_log=False,  # Disable access logs to prevent duplication
+                    timeout_keep_alive=125,  # Outlive the client's 120s pool so idle connections get reused
                     callback_notify=callback_notify_function  # Use a function, not a list
                 )
 
@@ -1023,6 +1024,7 @@ def start_server(use_ngrok: bool = None, port: int = None, ngrok_auth_token: Opt
                     log_level="info",
                     log_config=None,  # Disable uvicorn's default logging config
                     access_log=False,  # Disable access logs to prevent duplication
+                    timeout_keep_alive=125,  # Outlive the client's 120s pool so idle connections get reused
                     callback_notify=callback_notify_function  # Use a function, not a lambda or list
                 )
 
@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 from locallab.main import app
 from locallab.model_manager import ModelManager
 
@@ -37,3 +37,22 @@ def mock_model():
     model = Mock()
     model.generate.return_value = [[1, 2, 3, 4]]
     return model
+
+@pytest.fixture
+def streaming_model():
+    """
+    Fixture that patches the generation routes with a loaded model.
+    Returns a function that sets the tokens the model streams.
+    """
+    manager = Mock()
+    manager.current_model = "test-model"
+
+    def set_tokens(tokens):
+        async def generate_stream(**kwargs):
+            for token in tokens:
+                yield token
+        manager.generate_stream = generate_stream
+
+    with patch("locallab.routes.generate.model_manager", manager), \
+            patch("locallab.routes.generate.get_model_generation_params", return_value={}):
+        yield set_tokens
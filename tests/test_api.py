@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi import HTTPException
 from unittest.mock import patch
@@ -94,4 +95,30 @@ async def test_streaming_response(test_client):
     }) as response:
         assert response.status_code == 200
         for line in response.iter_lines():
-            assert line  # Check that we're getting data 
\ No newline at end of file
+            assert line  # Check that we're getting data 
+
+def test_streaming_error_event(test_client, streaming_model):
+    """Test that a failed stream ends with an SSE error event"""
+    streaming_model(["Hel", "\nError: boom"])
+    response = test_client.post("/generate", json={"prompt": "Test", "stream": True})
+    assert response.status_code == 200
+    assert response.text == "data: Hel\n\nevent: error\ndata: [ERROR] \\nError: boom\n\n"
+
+def test_websocket_generate(test_client, streaming_model):
+    """Test streaming several prompts over one WebSocket"""
+    streaming_model(["Hel", "lo\nworld"])
+    with test_client.websocket_connect("/ws/generate") as websocket:
+        for prompt in ["Test 1", "Test 2"]:
+            websocket.send_text(json.dumps({"prompt": prompt}))
+            assert [websocket.receive_text() for _ in range(3)] == ["Hel", "lo\nworld", "[DONE]"]
+
+def test_websocket_generate_error(test_client, streaming_model):
+    """Test WebSocket error frames for failed and invalid requests"""
+    streaming_model(["Hel", "\nError: boom"])
+    with test_client.websocket_connect("/ws/generate") as websocket:
+        websocket.send_text(json.dumps({"prompt": "Test"}))
+        assert websocket.receive_text() == "Hel"
+        assert websocket.receive_text() == "[ERROR] \nError: boom"
+
+        websocket.send_text(json.dumps({"temperature": 0.7}))
+        assert websocket.receive_text().startswith("[ERROR] Invalid request:")